@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Build-time precomputed data artifact for the Vercel functions.
+
+The CMS CSVs are downloaded and aggregated once, at build time, into a
+directory shipped with the deployment bundle:
+
+- manifest.json: format version, build time, source fingerprints, metrics
+- hospitals.json, benchmarks.json: the hospital list and benchmark tables
+- pivot/, hospitals/: the facility x metric matrix and hospital info as
+  columnar .npy files (the caremetrics.columnar_cache layout)
+- shards/NN.json: finished hospital-data records bucketed by Facility ID, so a
+  single-hospital lookup reads one small file; names.json maps names to IDs
+- tables/<name>.pickle: every derived table of api/_core.py (indexes,
+  records, distributions, ...), so serving never rebuilds one with pandas
+
+Functions serve from the artifact when one of the current format is present
+and only download from S3 when it is missing. Reading it needs only the
+stdlib and NumPy; pandas is imported only to build it or to read the frames.
+
+Usage:
+    python api/_artifact.py [--out api/_snapshot] [--hcahps CSV] [--hospitals CSV]
+"""
+
+import argparse
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+# Run as a script too, so the helpers and the backend's data modules are put on the path here
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [API_DIR, os.path.join(os.path.dirname(API_DIR), 'backend')]
+from caremetrics.distribution import percentile_fields_batch  # noqa: E402
+from caremetrics.records import normalize_facility_id, normalize_name  # noqa: E402
+from caremetrics.sources import HCAHPS_URL, HOSPITAL_URL, METRIC_IDS  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Bump when the artifact layout, the record shapes or a pickled table class change
+FORMAT_VERSION = 7
+
+ARTIFACT_DIR = Path(os.getenv('CAREMETRICS_ARTIFACT_DIR', Path(__file__).parent / '_snapshot'))
+
+# A few dozen hospitals per shard keeps single lookups to one small read
+SHARD_COUNT = 64
+
+
+def shard_of(facility_id) -> int:
+    return zlib.crc32(normalize_facility_id(facility_id).encode()) % SHARD_COUNT
+
+
+def _write_json(path: Path, value):
+    path.write_text(json.dumps(value, separators=(',', ':')))
+
+
+def write_artifact(pivot, hospitals, tables: Dict[str, object], out: Path = None,
+                   sources: Optional[Dict[str, Optional[str]]] = None) -> dict:
+    """Write the aggregated frames and their derived tables (_core.build_tables) atomically; returns the manifest"""
+    from caremetrics.columnar_cache import save_frame
+
+    out = Path(out or ARTIFACT_DIR)
+    averages, info_records = tables['averages'], tables['info_records']
+    labels = tables['labels']
+    ids, names = labels.ids, labels.names
+    metrics_with_ranks = percentile_fields_batch(tables['distributions'], tables['metric_records'], labels.states)
+
+    shards = [{} for _ in range(SHARD_COUNT)]
+    name_ids: Dict[str, str] = {}
+    for position, facility_id in enumerate(ids):
+        key = normalize_facility_id(facility_id)
+        # The first pivot row wins, as in the live ID and name indexes
+        shards[shard_of(key)].setdefault(key, {
+            "facilityId": facility_id,
+            "name": names[position],
+            "info": info_records[position],
+            "metrics": metrics_with_ranks[position],
+        })
+        if isinstance(names[position], str):
+            name_ids.setdefault(normalize_name(names[position]), key)
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'builtAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'sources': sources or {},
+        'rows': len(pivot),
+        'metrics': list(tables['metrics']),
+        'shards': SHARD_COUNT,
+        'tables': sorted(tables),
+    }
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=out.name + '.', dir=out.parent))
+    try:
+        save_frame(pivot, staging / 'pivot')
+        save_frame(hospitals, staging / 'hospitals')
+        _write_json(staging / 'hospitals.json', {"hospitals": list(dict.fromkeys(n for n in names if isinstance(n, str)))})
+        _write_json(staging / 'benchmarks.json', {"national": averages.national, "states": averages.by_state})
+        _write_json(staging / 'names.json', name_ids)
+        (staging / 'shards').mkdir()
+        for i, shard in enumerate(shards):
+            _write_json(staging / 'shards' / f"{i:02d}.json", shard)
+        (staging / 'tables').mkdir()
+        for name, table in tables.items():
+            with open(staging / 'tables' / f"{name}.pickle", 'wb') as f:
+                pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+        _write_json(staging / 'manifest.json', manifest)
+        if out.exists():
+            shutil.rmtree(out, ignore_errors=True)
+        os.replace(staging, out)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def load_manifest(path: Path = ARTIFACT_DIR) -> Optional[dict]:
+    """The artifact's manifest, or None when there is no usable artifact"""
+    try:
+        manifest = json.loads((Path(path) / 'manifest.json').read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != FORMAT_VERSION:
+        logger.warning(f"Ignoring artifact {path} of format {manifest.get('format')}")
+        return None
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def read_artifact(name: str, path: Path = ARTIFACT_DIR):
+    """A parsed JSON file of the artifact, or None when there is no usable artifact"""
+    if load_manifest(path) is None:
+        return None
+    return json.loads((Path(path) / name).read_text())
+
+
+def load_artifact_table(name: str, path: Path = ARTIFACT_DIR):
+    """A derived table stored in the artifact, or None when it has none of that name"""
+    manifest = load_manifest(path)
+    if manifest is None or name not in manifest.get('tables', ()):
+        return None
+    with open(Path(path) / 'tables' / f"{name}.pickle", 'rb') as f:
+        return pickle.load(f)
+
+
+def load_artifact_frames(path: Path = ARTIFACT_DIR):
+    """(pivot, hospitals) from the artifact, or None when there is no usable artifact"""
+    if load_manifest(path) is None:
+        return None
+    from caremetrics.columnar_cache import load_frame
+
+    pivot = load_frame(Path(path) / 'pivot')
+    # The live aggregation yields plain object text columns
+    for col in ('Facility ID', 'Facility Name', 'State'):
+        pivot[col] = pivot[col].to_numpy(dtype=object)
+    return pivot, load_frame(Path(path) / 'hospitals')
+
+
+def find_hospital(facility_id=None, name=None, path: Path = ARTIFACT_DIR) -> Optional[dict]:
+    """{"facilityId", "name", "info", "metrics"} for a Facility ID or name, None if not found"""
+    if facility_id is None:
+        facility_id = read_artifact('names.json', path).get(normalize_name(name))
+        if facility_id is None:
+            return None
+    key = normalize_facility_id(facility_id)
+    return read_artifact(f"shards/{shard_of(key):02d}.json", path).get(key)
+
+
+def read_source(location: str, **options):
+    from caremetrics.ingest import parse_csv, stream_csv
+
+    if location.startswith(('http://', 'https://')):
+        return stream_csv(location, **options)
+    return parse_csv(location, **options)
+
+
+def fingerprint(location: str) -> Optional[str]:
+    if not location.startswith(('http://', 'https://')):
+        return None
+    import requests
+    from caremetrics.columnar_cache import remote_fingerprint
+
+    try:
+        return remote_fingerprint(location)
+    except requests.RequestException:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the data artifact served by the Vercel functions")
+    parser.add_argument('--out', type=Path, default=ARTIFACT_DIR, help="Artifact directory")
+    parser.add_argument('--hcahps', default=HCAHPS_URL, help="HCAHPS CSV URL or path")
+    parser.add_argument('--hospitals', default=HOSPITAL_URL, help="Hospital General Information CSV URL or path")
+    args = parser.parse_args(argv)
+
+    from concurrent.futures import ThreadPoolExecutor
+    # _core imports this module, so it is imported here rather than at the top
+    from caremetrics.aggregation import aggregate_hcahps
+    from _core import build_tables
+    from caremetrics.ingest import HCAHPS_SCHEMA, HOSPITAL_SCHEMA
+
+    start = time.perf_counter()
+    sources = {args.hcahps: fingerprint(args.hcahps), args.hospitals: fingerprint(args.hospitals)}
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='fetch') as pool:
+        hcahps = pool.submit(read_source, args.hcahps, schema=HCAHPS_SCHEMA, usecols=True, measure_ids=METRIC_IDS)
+        hospitals = pool.submit(read_source, args.hospitals, schema=HOSPITAL_SCHEMA)
+        hcahps, hospitals = hcahps.result(), hospitals.result()
+    pivot = aggregate_hcahps(hcahps, METRIC_IDS)
+    manifest = write_artifact(pivot, hospitals, build_tables(pivot, hospitals), args.out, sources)
+    size = sum(f.stat().st_size for f in args.out.rglob('*') if f.is_file())
+    print(f"Wrote {args.out} ({manifest['rows']:,} hospitals, {size / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
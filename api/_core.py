@@ -0,0 +1,197 @@
+"""
+Shared data core for the Vercel functions.
+
+Every handler loads the CMS data and its derived tables through this module
+rather than keeping its own copy. A warm instance therefore holds one pivot
+and one set of indexes, whichever routes it serves, and api/router.py can
+serve the whole API from a single function. Derived tables are built on
+first use and memoized, so a route that only needs the benchmark table never
+pays for the search or similarity indexes.
+
+When the build-time artifact is present every table is unpickled from it
+as-is, using only the stdlib and NumPy. pandas and the CSV loaders are
+imported only when a table has to be rebuilt from the raw data.
+
+A background refresher polls the S3 objects while the instance is warm. When
+a new CMS release appears, it builds the complete table set on its own thread
+and swaps it in under the cache lock. Handlers read their tables with a single
+tables() call, so every response comes from one data version.
+
+The cache lock is only held to read or publish entries. Downloads, artifact
+reads and table builds run outside it, so a slow S3 fetch only delays the
+callers that need its result.
+"""
+
+import threading
+from typing import Callable, Dict
+
+from _artifact import load_artifact_frames, load_artifact_table, load_manifest
+from caremetrics.aggregation import aggregate_hcahps as aggregate_metrics, build_average_table, friendly_metrics
+from caremetrics.compact import build_compact
+from caremetrics.composite import build_composite_model
+from caremetrics.distribution import build_distributions
+from caremetrics.paging import build_page_index
+from caremetrics.peers import build_peer_cube
+from caremetrics.ranking import build_rank_index
+from caremetrics.records import build_id_index, build_info_records, build_labels, build_metric_records, build_name_index
+from caremetrics.refresher import SourceRefresher
+from caremetrics.search import build_search_index
+from caremetrics.similarity import build_similarity_index
+from caremetrics.sources import HCAHPS_URL, HOSPITAL_URL, METRIC_IDS
+
+__all__ = ['HCAHPS_URL', 'HOSPITAL_URL', 'METRIC_IDS', 'DATA_CACHE', 'CACHE_LOCK', 'fetch_csv', 'load_data',
+           'component', 'tables', 'data_version', 'serving_artifact', 'build_tables', 'refresh_data']
+
+# Simple in-memory cache (persists for the life of the serverless instance)
+DATA_CACHE = {}
+# Guards DATA_CACHE reads and updates only; nothing slow runs while it is held
+CACHE_LOCK = threading.Lock()
+# Held by the one caller loading the frames; callers that need them wait here, not on CACHE_LOCK
+LOAD_LOCK = threading.Lock()
+
+# The artifact (or first S3 load) is version 1; each background refresh adds one
+INITIAL_VERSION = 1
+
+def fetch_csv(url, schema=None, usecols=False, measure_ids=None):
+    from caremetrics.columnar_cache import cached_frame
+    from caremetrics.ingest import ingest_variant, stream_csv
+    # Parsed frames are streamed from S3 and kept in a columnar cache under /tmp keyed by the S3 ETag
+    return cached_frame(
+        url,
+        lambda u: stream_csv(u, schema=schema, usecols=usecols, measure_ids=measure_ids),
+        variant=ingest_variant(schema, usecols, measure_ids),
+    )
+
+def fetch_frames():
+    """(pivot, hospitals) aggregated from the S3 CSVs"""
+    from concurrent.futures import ThreadPoolExecutor
+    from caremetrics.ingest import HCAHPS_SCHEMA, HOSPITAL_SCHEMA
+    # Both files download and parse at once, so a cold load waits only for the slower one
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='fetch') as pool:
+        hcahps = pool.submit(fetch_csv, HCAHPS_URL, schema=HCAHPS_SCHEMA, usecols=True, measure_ids=METRIC_IDS)
+        hospitals = pool.submit(fetch_csv, HOSPITAL_URL, schema=HOSPITAL_SCHEMA)
+        hcahps, hospitals = hcahps.result(), hospitals.result()
+    return aggregate_metrics(hcahps, METRIC_IDS), hospitals
+
+def _frames():
+    with CACHE_LOCK:
+        if 'pivot' in DATA_CACHE:
+            return DATA_CACHE['pivot'], DATA_CACHE['hospitals']
+    return None
+
+def load_data():
+    """(pivot, hospitals) from the build-time artifact, else aggregated from the S3 CSVs"""
+    frames = _frames()
+    if frames is not None:
+        return frames
+    with LOAD_LOCK:
+        # Another caller may have loaded them, or a refresh swapped newer ones in, while this one waited
+        frames = _frames()
+        if frames is None:
+            frames = load_artifact_frames()
+            if frames is None:
+                # Versions as of this load, so a release published during the download is picked up later
+                REFRESHER.prime()
+                frames = fetch_frames()
+            with CACHE_LOCK:
+                DATA_CACHE.setdefault('pivot', frames[0])
+                DATA_CACHE.setdefault('hospitals', frames[1])
+                frames = DATA_CACHE['pivot'], DATA_CACHE['hospitals']
+    return frames
+
+def _version():
+    # Callers hold CACHE_LOCK
+    return DATA_CACHE.setdefault('version', INITIAL_VERSION)
+
+def data_version():
+    """Version of the data being served (keys the encoded-response caches)"""
+    with CACHE_LOCK:
+        return _version()
+
+def serving_artifact():
+    """Whether the build-time artifact is still the data being served (no refresh replaced it)"""
+    return load_manifest() is not None and data_version() == INITIAL_VERSION
+
+def _metrics(pivot, hospitals, table):
+    return tuple(m for m in friendly_metrics(METRIC_IDS) if m in pivot.columns)
+
+def _composite(pivot, hospitals, table):
+    ranking = table('ranking')
+    return build_composite_model(pivot, ranking.metrics, ranking.values)
+
+# Table name -> builder(pivot, hospitals, table), where table(name) returns a dependency of the same data
+BUILDERS: Dict[str, Callable] = {
+    'metrics': _metrics,
+    'labels': lambda pivot, hospitals, table: build_labels(pivot),
+    'info_columns': lambda pivot, hospitals, table: tuple(hospitals.columns),
+    'averages': lambda pivot, hospitals, table: build_average_table(pivot, friendly_metrics(METRIC_IDS)),
+    'info_records': lambda pivot, hospitals, table: build_info_records(pivot, hospitals),
+    'metric_records': lambda pivot, hospitals, table: build_metric_records(pivot, table('averages')),
+    'id_index': lambda pivot, hospitals, table: build_id_index(pivot),
+    'name_index': lambda pivot, hospitals, table: build_name_index(pivot),
+    'page_index': lambda pivot, hospitals, table: build_page_index(pivot),
+    'distributions': lambda pivot, hospitals, table: build_distributions(pivot, table('metrics')),
+    'peers': lambda pivot, hospitals, table: build_peer_cube(pivot, hospitals, table('metrics')),
+    'similarity': lambda pivot, hospitals, table: build_similarity_index(pivot, table('metrics')),
+    'search': lambda pivot, hospitals, table: build_search_index(pivot, hospitals),
+    'ranking': lambda pivot, hospitals, table: build_rank_index(pivot, table('metrics')),
+    'composite': _composite,
+    'compact': lambda pivot, hospitals, table: build_compact(pivot, hospitals, table('averages')),
+}
+
+def component(name):
+    """A derived table: from the artifact, else built from the loaded data on first use"""
+    REFRESHER.start()
+    while True:
+        with CACHE_LOCK:
+            if name in DATA_CACHE:
+                return DATA_CACHE[name]
+            version = _version()
+            # Once the frames are loaded, build from them so every table comes from the same data
+            from_artifact = 'pivot' not in DATA_CACHE and version == INITIAL_VERSION
+        table = load_artifact_table(name) if from_artifact else None
+        if table is None:
+            table = BUILDERS[name](*load_data(), component)
+        with CACHE_LOCK:
+            # A refresh swapped the data in meanwhile: this table is of the old version, so look again
+            if _version() == version:
+                return DATA_CACHE.setdefault(name, table)
+
+def tables(*names) -> Dict[str, object]:
+    """Several tables of one data version, and that 'version' (a refresh cannot swap the data in between)"""
+    while True:
+        for name in names:
+            component(name)
+        with CACHE_LOCK:
+            if all(name in DATA_CACHE for name in names):
+                found = {name: DATA_CACHE[name] for name in names}
+                found['version'] = _version()
+                return found
+
+def build_tables(pivot, hospitals) -> Dict[str, object]:
+    """Every derived table of (pivot, hospitals), built outside the shared cache"""
+    built = {}
+
+    def table(name):
+        if name not in built:
+            built[name] = BUILDERS[name](pivot, hospitals, table)
+        return built[name]
+
+    for name in BUILDERS:
+        table(name)
+    return built
+
+def refresh_data():
+    """Rebuild every table from the S3 CSVs on the refresher thread, then swap them all in at once"""
+    pivot, hospitals = fetch_frames()
+    built = build_tables(pivot, hospitals)
+    with CACHE_LOCK:
+        version = _version() + 1
+        DATA_CACHE.clear()
+        DATA_CACHE.update(built, pivot=pivot, hospitals=hospitals, version=version)
+
+# Polls S3 for new CMS releases while the instance is warm; started by the first table lookup
+REFRESHER = SourceRefresher((HCAHPS_URL, HOSPITAL_URL), refresh_data)
+if load_manifest() is not None:
+    # The artifact records the ETags it was built from, so its version is known without a request
+    REFRESHER.prime(load_manifest().get('sources', {}))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the Vercel function handlers.
+
+Each handler is imported in a fresh interpreter under `python -X importtime`,
+as a cold start imports it, and the modules it pulls in are totalled against
+a budget. Modules the interpreter imports at startup are left out. The report
+also shows whether the import loaded pandas, which a handler serving from the
+build-time artifact should not do. The exit status is 1 when a handler is
+over budget, so the check can gate a deploy.
+
+Usage:
+    python api/_importtime.py [--budget-ms 250] [--top 3] [handler ...]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+API_DIR = Path(__file__).resolve().parent
+
+# Cold-start import budget per handler, in milliseconds
+IMPORT_BUDGET_MS = 250
+
+# Imports the handler the way the router and the Vercel runtime do: by file path
+LOAD_HANDLER = (
+    "import importlib.util, sys; "
+    "spec = importlib.util.spec_from_file_location('handler_module', sys.argv[1]); "
+    "spec.loader.exec_module(importlib.util.module_from_spec(spec))"
+)
+
+# import time: <self us> | <cumulative us> | <two spaces per nesting level><module>
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+class ImportReport(NamedTuple):
+    handler: str
+    total_ms: float
+    modules: List[Tuple[str, float]]
+    pandas: bool
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, str, float]]:
+    """(depth, module, cumulative ms) per line of -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            entries.append((len(match.group(3)) // 2, match.group(4), int(match.group(2)) / 1000))
+    return entries
+
+
+def _importtime(args: List[str]) -> List[Tuple[int, str, float]]:
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], capture_output=True, text=True,
+                            cwd=API_DIR, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'})
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed')
+    return parse_importtime(result.stderr)
+
+
+def measure(handler: str, startup: frozenset) -> ImportReport:
+    entries = _importtime(['-c', LOAD_HANDLER, str(API_DIR / f"{handler}.py")])
+    modules: Dict[str, float] = {}
+    for depth, module, cumulative in entries:
+        if depth == 0 and module not in startup:
+            modules[module] = modules.get(module, 0.0) + cumulative
+    return ImportReport(
+        handler=handler,
+        total_ms=sum(modules.values()),
+        modules=sorted(modules.items(), key=lambda item: -item[1]),
+        pandas=any(module == 'pandas' for _, module, _ in entries),
+    )
+
+
+def handlers() -> List[str]:
+    """Route modules: the api/*.py files that are not shared helpers"""
+    return sorted(path.stem for path in API_DIR.glob('*.py') if not path.name.startswith('_'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the cold-start import time of each Vercel handler")
+    parser.add_argument('handlers', nargs='*', help="Handlers to measure (default: all)")
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS, help="Import budget per handler")
+    parser.add_argument('--top', type=int, default=3, help="Heaviest imports to list per handler")
+    args = parser.parse_args(argv)
+
+    startup = frozenset(module for _, module, _ in _importtime(['-c', 'pass']))
+    over = 0
+    print(f"{'handler':<20} {'import ms':>9}  {'pandas':<6}  heaviest imports")
+    for name in args.handlers or handlers():
+        report = measure(name, startup)
+        flag = ' OVER' if report.total_ms > args.budget_ms else ''
+        over += bool(flag)
+        heaviest = ', '.join(f"{module} {ms:.1f}" for module, ms in report.modules[:args.top])
+        print(f"{name:<20} {report.total_ms:>9.1f}  {'yes' if report.pandas else 'no':<6}  {heaviest}{flag}")
+    print(f"budget {args.budget_ms:.0f} ms per handler: {over} over")
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,185 +1,99 @@
-import pandas as pd
 import json
-import requests
 from http.server import BaseHTTPRequestHandler
-import threading
-import io
-import math
+from urllib.parse import urlparse, parse_qs
+import os
+import sys
 
-# S3 URLs
-HCAHPS_URL = 'https://hospital-benchmark-data.s3.us-east-1.amazonaws.com/HCAHPS.csv'
-HOSPITAL_URL = 'https://hospital-benchmark-data.s3.us-east-1.amazonaws.com/Hospital_General_Information.csv'
+# Shared helpers live next to the handlers (underscore files are not deployed as routes);
+# the data modules are the backend's own, from backend/caremetrics
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [API_DIR, os.path.join(os.path.dirname(API_DIR), 'backend')]
+from _core import METRIC_IDS, tables
+from caremetrics.aggregation import friendly_metrics
+from caremetrics.compact import COMPACT_MEDIA_TYPE, wants_compact
+from caremetrics.paging import build_page, iter_ndjson, parse_fields, parse_limit, wants_ndjson
+from caremetrics.records import build_all_hospitals
+from caremetrics.response_cache import ResponseCache, dumps
 
-# Simple in-memory cache (persists for the life of the serverless instance)
-DATA_CACHE = {}
-CACHE_LOCK = threading.Lock()
+RESPONSE_CACHE = ResponseCache()
 
-METRIC_IDS = {
-    'H_COMP_1_A_P': 'Nurse Communication',
-    'H_COMP_2_A_P': 'Doctor Communication',
-    'H_COMP_3_A_P': 'Staff Responsiveness',
-    'H_CALL_BUTTON_A_P': 'Staff Responsiveness',
-    'H_BATH_HELP_A_P': 'Staff Responsiveness',
-    'H_SIDE_EFFECTS_A_P': 'Care Transition',
-    'H_DISCH_HELP_Y_P': 'Discharge Info',
-    'H_CLEAN_HSP_A_P': 'Care Cleanliness',
-    'H_QUIET_HSP_A_P': 'Quietness',
-    'H_RECMND_DY': 'Recommend'
-}
+def hospital_tables(*extra):
+    """The per-hospital record tables (plus extra ones), all of one data version even if a refresh lands meanwhile"""
+    return tables('labels', 'info_records', 'metric_records', *extra)
 
-def fetch_csv(url):
-    resp = requests.get(url)
-    resp.raise_for_status()
-    return pd.read_csv(io.StringIO(resp.text), low_memory=False)
+def get_all_hospitals_data(data):
+    return build_all_hospitals(data['labels'], data['info_records'], data['metric_records'], info_state=True)
 
-def load_data():
-    with CACHE_LOCK:
-        if not DATA_CACHE:
-            hcahps = fetch_csv(HCAHPS_URL)
-            hospitals = fetch_csv(HOSPITAL_URL)
-            DATA_CACHE['hcahps'] = hcahps
-            DATA_CACHE['hospitals'] = hospitals
-        return DATA_CACHE['hcahps'], DATA_CACHE['hospitals']
+def get_all_hospitals_page(limit=None, cursor=None, state=None, fields=None):
+    """One page of hospitals in name order: (body bytes, error)"""
+    data = hospital_tables('info_columns', 'page_index')
+    try:
+        info_fields, metric_fields = parse_fields(fields, data['info_columns'], friendly_metrics(METRIC_IDS))
+        positions, next_cursor, total = data['page_index'].page(parse_limit(limit), cursor, state)
+    except ValueError as e:
+        return None, str(e)
+    page = {
+        "hospitals": build_page(data['labels'], data['info_records'], data['metric_records'], positions,
+                                info_fields, metric_fields, info_state=True),
+        "nextCursor": next_cursor,
+        "total": total,
+    }
+    return dumps(page), None
 
-def aggregate_hcahps():
-    hcahps, hospitals = load_data()
-    
-    # Filter for relevant metrics and "Always" responses (A_P)
-    filtered = hcahps[hcahps['HCAHPS Measure ID'].isin(METRIC_IDS.keys())].copy()
-    
-    # Convert HCAHPS Answer Percent to numeric, handling errors
-    filtered['HCAHPS Answer Percent'] = pd.to_numeric(filtered['HCAHPS Answer Percent'], errors='coerce')
-    
-    # Remove rows with NaN values
-    filtered = filtered.dropna(subset=['HCAHPS Answer Percent'])
-    
-    # Group by hospital and metric, then average the percentages
-    grouped = filtered.groupby(['Facility ID', 'Facility Name', 'State', 'HCAHPS Measure ID'])['HCAHPS Answer Percent'].mean().reset_index()
-    
-    # Pivot to get one row per hospital, columns are HCAHPS Measure IDs
-    pivot = grouped.pivot_table(
-        index=['Facility ID', 'Facility Name', 'State'],
-        columns='HCAHPS Measure ID',
-        values='HCAHPS Answer Percent',
-        aggfunc='mean'
-    ).reset_index()
-    
-    # Fill NaN values with 0
-    pivot = pivot.fillna(0)
-    
-    # For each friendly metric name, average all columns that map to it
-    for friendly_name in set(METRIC_IDS.values()):
-        cols = [k for k, v in METRIC_IDS.items() if v == friendly_name]
-        if len(cols) > 1:
-            # Get all columns that exist in the pivot table
-            existing_cols = [col for col in cols if col in pivot.columns]
-            if existing_cols:
-                pivot[friendly_name] = pivot[existing_cols].mean(axis=1)
-            else:
-                pivot[friendly_name] = 0
-        elif len(cols) == 1:
-            if cols[0] in pivot.columns:
-                pivot[friendly_name] = pivot[cols[0]]
-            else:
-                pivot[friendly_name] = 0
-        else:
-            pivot[friendly_name] = 0
-    
-    # Only keep the friendly columns and the index columns
-    keep_cols = ['Facility ID', 'Facility Name', 'State'] + list(set(METRIC_IDS.values()))
-    pivot = pivot[keep_cols]
-    
-    return pivot, hospitals
+def get_ndjson_lines(state=None, fields=None):
+    """(NDJSON chunk iterator, error) for every hospital, optionally one state's"""
+    data = hospital_tables('info_columns', 'page_index')
+    try:
+        info_fields, metric_fields = parse_fields(fields, data['info_columns'], friendly_metrics(METRIC_IDS))
+    except ValueError as e:
+        return None, str(e)
+    positions = data['page_index'].rows(state)
+    return iter_ndjson(data['labels'], data['info_records'], data['metric_records'], positions,
+                       info_fields, metric_fields, info_state=True), None
 
-def get_all_hospitals_data():
-    pivot, hospitals = aggregate_hcahps()
-    all_data = {}
-    
-    # Calculate national averages for each metric
-    national_averages = {}
-    for col in METRIC_IDS.values():
-        if col in pivot.columns:
-            try:
-                vals = pd.to_numeric(pivot[col], errors='coerce').dropna()
-                if len(vals) > 0:
-                    national_averages[col] = float(vals.mean())
-                else:
-                    national_averages[col] = 75.0  # Default fallback
-            except Exception:
-                national_averages[col] = 75.0  # Default fallback
-    
-    # Calculate state averages for each metric
-    state_averages = {}
-    for state in pivot['State'].unique():
-        state_data = pivot[pivot['State'] == state]
-        state_averages[state] = {}
-        for col in METRIC_IDS.values():
-            if col in state_data.columns:
-                try:
-                    vals = pd.to_numeric(state_data[col], errors='coerce').dropna()
-                    if len(vals) > 0:
-                        state_averages[state][col] = float(vals.mean())
-                    else:
-                        state_averages[state][col] = 75.0  # Default fallback
-                except Exception:
-                    state_averages[state][col] = 75.0  # Default fallback
-    
-    # Process all hospitals
-    for _, row in pivot.iterrows():
-        name = row['Facility Name']
-        state = row['State']
-        info = hospitals[hospitals['Facility Name'] == name].iloc[0].to_dict() if not hospitals[hospitals['Facility Name'] == name].empty else {}
-        
-        # Clean info dict for JSON serialization
-        clean_info = {}
-        for k, v in info.items():
-            if isinstance(v, float) and (pd.isnull(v) or not math.isfinite(v)):
-                clean_info[k] = ''
-            elif isinstance(v, (int, float)):
-                clean_info[k] = v
-            else:
-                clean_info[k] = str(v) if v is not None else ''
-        
-        # Add state information
-        clean_info['state'] = state
-        
-        # Build metrics with proper structure
-        metrics = {}
-        for col in METRIC_IDS.values():
-            if col in row:
-                try:
-                    hospital_val = row[col]
-                    if pd.notnull(hospital_val) and hospital_val != '':
-                        fval = float(hospital_val)
-                        if math.isfinite(fval):
-                            state_avg = state_averages.get(state, {}).get(col, 75.0)
-                            national_avg = national_averages.get(col, 75.0)
-                            
-                            metrics[col] = {
-                                "hospital": fval,
-                                "state": state_avg,
-                                "national": national_avg,
-                                "vsState": round(fval - state_avg, 1),
-                                "vsNational": round(fval - national_avg, 1)
-                            }
-                except Exception:
-                    continue
-        
-        all_data[name] = {"info": clean_info, "metrics": metrics}
-    
-    return all_data
+def get_encoded_response(compact=False):
+    # Bodies are cached per data version; each is built from the tables of the version it is stored under
+    if compact:
+        data = tables('compact')
+        return RESPONSE_CACHE.get('all-hospitals-data:columns', data['version'], lambda: data['compact'])
+    data = hospital_tables()
+    return RESPONSE_CACHE.get('all-hospitals-data', data['version'], lambda: get_all_hospitals_data(data))
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
-            all_data = get_all_hospitals_data()
+            query = parse_qs(urlparse(self.path).query)
+            params = {name: query[name][0] for name in ('limit', 'cursor', 'state', 'fields') if name in query}
+            if wants_ndjson(query.get('format', [None])[0], self.headers.get('Accept')):
+                self.send_ndjson(params.get('state'), params.get('fields'))
+                return
+            if params:
+                self.send_page(params)
+                return
+            compact = wants_compact(query.get('format', [None])[0], self.headers.get('Accept'))
+            entry = get_encoded_response(compact)
+            if entry.not_modified(self.headers.get('If-None-Match')):
+                self.send_response(304)
+                self.send_header('ETag', entry.etag)
+                self.send_header('Vary', 'Accept, Accept-Encoding')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                return
+            body, encoding = entry.negotiate(self.headers.get('Accept-Encoding'))
             self.send_response(200)
-            self.send_header('Content-type', 'application/json')
+            self.send_header('Content-type', COMPACT_MEDIA_TYPE if compact else 'application/json')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', entry.etag)
+            self.send_header('Vary', 'Accept, Accept-Encoding')
+            self.send_header('Cache-Control', 'no-cache')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
             self.send_header('Access-Control-Allow-Headers', 'Content-Type')
             self.end_headers()
-            self.wfile.write(json.dumps(all_data).encode())
+            self.wfile.write(body)
         except Exception as e:
             self.send_response(500)
             self.send_header('Content-type', 'application/json')
@@ -189,6 +103,38 @@ class handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({"error": str(e)}).encode())
     
+    def send_page(self, params):
+        body, error = get_all_hospitals_page(**params)
+        self.send_response(400 if error else 200)
+        self.send_header('Content-type', 'application/json')
+        if body is not None:
+            self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+        self.wfile.write(body if body is not None else json.dumps({"error": error}).encode())
+
+    def send_ndjson(self, state, fields):
+        lines, error = get_ndjson_lines(state, fields)
+        if error:
+            self.send_response(400)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": error}).encode())
+            return
+        # No Content-Length: the body is written batch by batch and ends when the connection closes
+        self.send_response(200)
+        self.send_header('Content-type', 'application/x-ndjson')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+        for chunk in lines:
+            self.wfile.write(chunk)
+            self.wfile.flush()
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
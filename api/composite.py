@@ -0,0 +1,64 @@
+import json
+from http.server import BaseHTTPRequestHandler
+import os
+import sys
+from urllib.parse import urlparse, parse_qs
+
+# Shared helpers live next to the handlers (underscore files are not deployed as routes);
+# the data modules are the backend's own, from backend/caremetrics
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [API_DIR, os.path.join(os.path.dirname(API_DIR), 'backend')]
+from _core import tables
+from caremetrics.composite import composite_rows, parse_weights
+from caremetrics.peers import peer_filters
+from caremetrics.ranking import parse_rank_query
+
+def build_model():
+    return tables('labels', 'peers', 'composite')
+
+def get_composite(params):
+    """(result, error) for one page of hospitals ranked by a weighted composite score"""
+    lookup = build_model()
+    group = peer_filters(params)
+    try:
+        limit, offset, _, _, _ = parse_rank_query(params.get('limit'), params.get('offset'), None, None, None)
+        result = lookup['composite'].scores(parse_weights(params.get('weights')))
+        rows = result.order
+        if group:
+            rows = rows[lookup['peers'].group_mask(group)[rows]]
+    except ValueError as e:
+        return None, str(e)
+    return {
+        "weights": result.weights,
+        "group": group,
+        "total": len(rows),
+        "hospitals": composite_rows(result, lookup['labels'], rows[offset:offset + limit]),
+    }, None
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            query = parse_qs(urlparse(self.path).query)
+            result, error = get_composite({name: values[0] for name, values in query.items()})
+            self.send_response(400 if error else 200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": error} if error else result).encode())
+        except Exception as e:
+            self.send_response(500)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": str(e)}).encode())
+    
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers() 
\ No newline at end of file
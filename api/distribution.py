@@ -0,0 +1,62 @@
+import json
+from http.server import BaseHTTPRequestHandler
+import os
+import sys
+from urllib.parse import urlparse, parse_qs, unquote
+
+# Shared helpers live next to the handlers (underscore files are not deployed as routes);
+# the data modules are the backend's own, from backend/caremetrics
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [API_DIR, os.path.join(os.path.dirname(API_DIR), 'backend')]
+from _core import component
+
+def get_distributions():
+    return component('distributions')
+
+def get_distribution(metric, state=None):
+    """(summary, error) for a metric, nationally or for one state"""
+    distribution = get_distributions().get(metric)
+    if distribution is None:
+        return None, "Metric not found"
+    state = state.strip().upper() if state else None
+    summary = distribution.summary(state)
+    if summary is None:
+        return None, "State not found"
+    return {"metric": metric, "state": state, **summary}, None
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            # /api/distribution/<metric>[?state=XX]
+            parsed_url = urlparse(self.path)
+            query = parse_qs(parsed_url.query)
+            path_parts = parsed_url.path.split('/')
+            metric = query.get('metric', [None])[0]
+            for i, part in enumerate(path_parts):
+                if part == 'distribution' and i + 1 < len(path_parts) and path_parts[i + 1]:
+                    metric = unquote(path_parts[i + 1])
+                    break
+
+            result, error = get_distribution(metric, query.get('state', [None])[0])
+            self.send_response(404 if error else 200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": error} if error else result).encode())
+        except Exception as e:
+            self.send_response(500)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": str(e)}).encode())
+    
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers() 
\ No newline at end of file
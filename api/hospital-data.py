@@ -1,150 +1,85 @@
-import pandas as pd
 import json
-import requests
 from http.server import BaseHTTPRequestHandler
-import threading
-import io
-import math
-from urllib.parse import urlparse, parse_qs
+import os
+import sys
+from urllib.parse import urlparse
 
-# S3 URLs
-HCAHPS_URL = 'https://hospital-benchmark-data.s3.us-east-1.amazonaws.com/HCAHPS.csv'
-HOSPITAL_URL = 'https://hospital-benchmark-data.s3.us-east-1.amazonaws.com/Hospital_General_Information.csv'
+# Shared helpers live next to the handlers (underscore files are not deployed as routes);
+# the data modules are the backend's own, from backend/caremetrics
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [API_DIR, os.path.join(os.path.dirname(API_DIR), 'backend')]
+from _artifact import find_hospital
+from _core import serving_artifact, tables
+from caremetrics.distribution import percentile_fields, percentile_fields_batch
+from caremetrics.records import normalize_facility_id, normalize_name
 
-# Simple in-memory cache (persists for the life of the serverless instance)
-DATA_CACHE = {}
-CACHE_LOCK = threading.Lock()
+def build_lookup():
+    return tables('labels', 'distributions', 'info_records', 'metric_records', 'id_index', 'name_index')
 
-METRIC_IDS = {
-    'H_COMP_1_A_P': 'Nurse Communication',
-    'H_COMP_2_A_P': 'Doctor Communication',
-    'H_COMP_3_A_P': 'Staff Responsiveness',
-    'H_CALL_BUTTON_A_P': 'Staff Responsiveness',
-    'H_BATH_HELP_A_P': 'Staff Responsiveness',
-    'H_SIDE_EFFECTS_A_P': 'Care Transition',
-    'H_DISCH_HELP_Y_P': 'Discharge Info',
-    'H_CLEAN_HSP_A_P': 'Care Cleanliness',
-    'H_QUIET_HSP_A_P': 'Quietness',
-    'H_RECMND_DY': 'Recommend'
-}
+def get_hospital_data(hospital_name=None, facility_id=None):
+    if serving_artifact():
+        # Precomputed records: one shard read instead of building every index
+        record = find_hospital(facility_id, hospital_name)
+        if record is None:
+            return None, "Hospital not found"
+        return {"info": record['info'], "metrics": record['metrics']}, None
+    lookup = build_lookup()
+    if facility_id is not None:
+        position = lookup['id_index'].get(normalize_facility_id(facility_id))
+    else:
+        positions = lookup['name_index'].get(normalize_name(hospital_name))
+        position = positions[0] if positions else None
+    if position is None:
+        return None, "Hospital not found"
+    
+    metrics = percentile_fields(lookup['distributions'], lookup['metric_records'][position],
+                                lookup['labels'].states[position])
+    return {"info": lookup['info_records'][position], "metrics": metrics}, None
 
-def fetch_csv(url):
-    resp = requests.get(url)
-    resp.raise_for_status()
-    return pd.read_csv(io.StringIO(resp.text), low_memory=False)
+# Largest number of hospitals one batch request may ask for
+MAX_BATCH_SIZE = 100
 
-def load_data():
-    with CACHE_LOCK:
-        if not DATA_CACHE:
-            hcahps = fetch_csv(HCAHPS_URL)
-            hospitals = fetch_csv(HOSPITAL_URL)
-            DATA_CACHE['hcahps'] = hcahps
-            DATA_CACHE['hospitals'] = hospitals
-        return DATA_CACHE['hcahps'], DATA_CACHE['hospitals']
+def find_position(lookup, item):
+    if isinstance(item, dict) and item.get('facilityId') is not None:
+        return lookup['id_index'].get(normalize_facility_id(item['facilityId']))
+    if isinstance(item, dict) and item.get('name') is not None:
+        positions = lookup['name_index'].get(normalize_name(item['name']))
+        return positions[0] if positions else None
+    return None
 
-def aggregate_hcahps():
-    hcahps, hospitals = load_data()
-    
-    # Filter for relevant metrics and "Always" responses (A_P)
-    filtered = hcahps[hcahps['HCAHPS Measure ID'].isin(METRIC_IDS.keys())].copy()
-    
-    # Convert HCAHPS Answer Percent to numeric, handling errors
-    filtered['HCAHPS Answer Percent'] = pd.to_numeric(filtered['HCAHPS Answer Percent'], errors='coerce')
-    
-    # Remove rows with NaN values
-    filtered = filtered.dropna(subset=['HCAHPS Answer Percent'])
-    
-    # Group by hospital and metric, then average the percentages
-    grouped = filtered.groupby(['Facility ID', 'Facility Name', 'State', 'HCAHPS Measure ID'])['HCAHPS Answer Percent'].mean().reset_index()
-    
-    # Pivot to get one row per hospital, columns are HCAHPS Measure IDs
-    pivot = grouped.pivot_table(
-        index=['Facility ID', 'Facility Name', 'State'],
-        columns='HCAHPS Measure ID',
-        values='HCAHPS Answer Percent',
-        aggfunc='mean'
-    ).reset_index()
-    
-    # Fill NaN values with 0
-    pivot = pivot.fillna(0)
-    
-    # For each friendly metric name, average all columns that map to it
-    for friendly_name in set(METRIC_IDS.values()):
-        cols = [k for k, v in METRIC_IDS.items() if v == friendly_name]
-        if len(cols) > 1:
-            # Get all columns that exist in the pivot table
-            existing_cols = [col for col in cols if col in pivot.columns]
-            if existing_cols:
-                pivot[friendly_name] = pivot[existing_cols].mean(axis=1)
-            else:
-                pivot[friendly_name] = 0
-        elif len(cols) == 1:
-            if cols[0] in pivot.columns:
-                pivot[friendly_name] = pivot[cols[0]]
-            else:
-                pivot[friendly_name] = 0
-        else:
-            pivot[friendly_name] = 0
-    
-    # Only keep the friendly columns and the index columns
-    keep_cols = ['Facility ID', 'Facility Name', 'State'] + list(set(METRIC_IDS.values()))
-    pivot = pivot[keep_cols]
-    
-    return pivot, hospitals
+def find_record(item):
+    if isinstance(item, dict) and item.get('facilityId') is not None:
+        return find_hospital(facility_id=item['facilityId'])
+    if isinstance(item, dict) and item.get('name') is not None:
+        return find_hospital(name=item['name'])
+    return None
 
-def get_hospital_data(hospital_name):
-    pivot, hospitals = aggregate_hcahps()
-    row = pivot[pivot['Facility Name'] == hospital_name]
-    if row.empty:
-        return None, "Hospital not found"
-    
-    info = hospitals[hospitals['Facility Name'] == hospital_name].iloc[0].to_dict() if not hospitals[hospitals['Facility Name'] == hospital_name].empty else {}
-    
-    # Calculate national averages for each metric
-    national_averages = {}
-    for col in METRIC_IDS.values():
-        if col in pivot.columns:
-            try:
-                vals = pd.to_numeric(pivot[col], errors='coerce').dropna()
-                if len(vals) > 0:
-                    national_averages[col] = float(vals.mean())
-                else:
-                    national_averages[col] = 75.0
-            except Exception:
-                national_averages[col] = 75.0
-    
-    # Calculate state average for the hospital's state
-    state = row.iloc[0]['State']
-    state_data = pivot[pivot['State'] == state]
-    state_averages = {}
-    for col in METRIC_IDS.values():
-        if col in state_data.columns:
-            try:
-                vals = pd.to_numeric(state_data[col], errors='coerce').dropna()
-                if len(vals) > 0:
-                    state_averages[col] = float(vals.mean())
-                else:
-                    state_averages[col] = 75.0
-            except Exception:
-                state_averages[col] = 75.0
-    
-    # Build metrics with proper structure
-    metrics = {}
-    for col in METRIC_IDS.values():
-        if col in row.columns and pd.notnull(row.iloc[0][col]):
-            hospital_val = float(row.iloc[0][col])
-            state_avg = state_averages.get(col, 75.0)
-            national_avg = national_averages.get(col, 75.0)
-            
-            metrics[col] = {
-                "hospital": hospital_val,
-                "state": state_avg,
-                "national": national_avg,
-                "vsState": round(hospital_val - state_avg, 1),
-                "vsNational": round(hospital_val - national_avg, 1)
-            }
-    
-    return {"info": info, "metrics": metrics}, None
+def get_hospital_data_batch(items):
+    """(results in request order, error) for a list of {"facilityId"} / {"name"} items"""
+    if not isinstance(items, list):
+        return None, 'Expected {"hospitals": [{"facilityId": ...} or {"name": ...}]}'
+    if len(items) > MAX_BATCH_SIZE:
+        return None, f"At most {MAX_BATCH_SIZE} hospitals per request"
+    if serving_artifact():
+        records = [find_record(item) for item in items]
+        return [
+            {"request": item, "found": True, **record} if record is not None else
+            {"request": item, "found": False, "error": "Hospital not found"}
+            for item, record in zip(items, records)
+        ], None
+    lookup = build_lookup()
+    positions = [find_position(lookup, item) for item in items]
+    found = [p for p in positions if p is not None]
+    metrics = iter(percentile_fields_batch(lookup['distributions'], [lookup['metric_records'][p] for p in found],
+                                           [lookup['labels'].states[p] for p in found]))
+    return [
+        {"request": item, "found": True, "facilityId": lookup['labels'].ids[position],
+         "name": lookup['labels'].names[position],
+         "info": lookup['info_records'][position], "metrics": next(metrics)}
+        if position is not None else
+        {"request": item, "found": False, "error": "Hospital not found"}
+        for item, position in zip(items, positions)
+    ], None
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -153,14 +88,18 @@ class handler(BaseHTTPRequestHandler):
             parsed_url = urlparse(self.path)
             path_parts = parsed_url.path.split('/')
             
-            # Find the hospital name in the path
+            # Find the hospital name (or by-id/<Facility ID>) in the path
             hospital_name = None
+            facility_id = None
             for i, part in enumerate(path_parts):
                 if part == 'hospital-data' and i + 1 < len(path_parts):
-                    hospital_name = path_parts[i + 1]
+                    if path_parts[i + 1] == 'by-id' and i + 2 < len(path_parts):
+                        facility_id = path_parts[i + 2]
+                    else:
+                        hospital_name = path_parts[i + 1]
                     break
             
-            if not hospital_name:
+            if not hospital_name and not facility_id:
                 self.send_response(400)
                 self.send_header('Content-type', 'application/json')
                 self.send_header('Access-Control-Allow-Origin', '*')
@@ -172,9 +111,10 @@ class handler(BaseHTTPRequestHandler):
             
             # URL decode the hospital name
             import urllib.parse
-            hospital_name = urllib.parse.unquote(hospital_name)
-            
-            result, error = get_hospital_data(hospital_name)
+            if facility_id:
+                result, error = get_hospital_data(facility_id=urllib.parse.unquote(facility_id))
+            else:
+                result, error = get_hospital_data(urllib.parse.unquote(hospital_name))
             
             if error:
                 self.send_response(404)
@@ -202,9 +142,37 @@ class handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({"error": str(e)}).encode())
     
+    def do_POST(self):
+        try:
+            # POST /api/hospital-data/batch with {"hospitals": [...]}
+            if not urlparse(self.path).path.rstrip('/').endswith('/batch'):
+                results, error, status = None, "Not found", 404
+            else:
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                    results, error = get_hospital_data_batch(body.get('hospitals') if isinstance(body, dict) else None)
+                except ValueError:
+                    results, error = None, "Invalid JSON body"
+                status = 400 if error else 200
+            self.send_response(status)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": error} if error else {"results": results}).encode())
+        except Exception as e:
+            self.send_response(500)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": str(e)}).encode())
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers() 
\ No newline at end of file
@@ -0,0 +1,67 @@
+import json
+from http.server import BaseHTTPRequestHandler
+import os
+import sys
+from urllib.parse import urlparse, parse_qs
+
+# Shared helpers live next to the handlers (underscore files are not deployed as routes);
+# the data modules are the backend's own, from backend/caremetrics
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [API_DIR, os.path.join(os.path.dirname(API_DIR), 'backend')]
+from _core import tables
+from caremetrics.peers import compare_to_peers, parse_peer_dimensions, peer_filters
+from caremetrics.records import normalize_facility_id
+
+def build_peers():
+    return tables('peers', 'metric_records', 'id_index')
+
+def get_peer_benchmarks(params):
+    """(result, status, error) for a peer group given directly or by facilityId + by="""
+    peers = build_peers()
+    cube = peers['peers']
+    position = None
+    try:
+        if 'facilityId' in params:
+            position = peers['id_index'].get(normalize_facility_id(params['facilityId']))
+            if position is None:
+                return None, 404, "Hospital not found"
+            group = cube.peer_group(position, parse_peer_dimensions(params.get('by') or 'state'))
+        else:
+            group = peer_filters(params)
+        metrics = cube.lookup(**group)
+    except ValueError as e:
+        return None, 400, str(e)
+    if metrics is None:
+        return None, 404, "No hospitals in this peer group"
+    if position is not None:
+        metrics = compare_to_peers(metrics, peers['metric_records'][position])
+    return {"group": group, "metrics": metrics}, 200, None
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            query = parse_qs(urlparse(self.path).query)
+            params = {name: values[0] for name, values in query.items()}
+            result, status, error = get_peer_benchmarks(params)
+            self.send_response(status)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": error} if error else result).encode())
+        except Exception as e:
+            self.send_response(500)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": str(e)}).encode())
+    
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers() 
\ No newline at end of file
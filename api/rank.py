@@ -0,0 +1,74 @@
+import json
+from http.server import BaseHTTPRequestHandler
+import os
+import sys
+from urllib.parse import urlparse, parse_qs
+
+# Shared helpers live next to the handlers (underscore files are not deployed as routes);
+# the data modules are the backend's own, from backend/caremetrics
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [API_DIR, os.path.join(os.path.dirname(API_DIR), 'backend')]
+from _core import tables
+from caremetrics.peers import peer_filters
+from caremetrics.ranking import parse_rank_query
+
+def build_index():
+    return tables('labels', 'peers', 'ranking')
+
+def get_rank(params):
+    """(result, error) for one page of a metric leaderboard"""
+    if not params.get('metric'):
+        return None, "metric is required"
+    lookup = build_index()
+    index = lookup['ranking']
+    metric = params['metric']
+    group = peer_filters(params)
+    try:
+        limit, offset, descending, minimum, maximum = parse_rank_query(
+            params.get('limit'), params.get('offset'), params.get('order'), params.get('min'), params.get('max'))
+        mask = lookup['peers'].group_mask(group) if group else None
+        rows, total = index.top(metric, limit, descending, mask, minimum, maximum, offset)
+    except ValueError as e:
+        return None, str(e)
+    column = index.values[:, index.metrics.index(metric)]
+    labels = lookup['labels']
+    ids, names, states = labels.ids, labels.names, labels.states
+    return {
+        "metric": metric,
+        "order": "desc" if descending else "asc",
+        "group": group,
+        "total": total,
+        "hospitals": [
+            {"rank": offset + i + 1, "facilityId": ids[row], "name": names[row],
+             "state": states[row], "value": float(column[row])}
+            for i, row in enumerate(rows.tolist())
+        ],
+    }, None
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            query = parse_qs(urlparse(self.path).query)
+            result, error = get_rank({name: values[0] for name, values in query.items()})
+            self.send_response(400 if error else 200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": error} if error else result).encode())
+        except Exception as e:
+            self.send_response(500)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": str(e)}).encode())
+    
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers() 
\ No newline at end of file
@@ -0,0 +1,67 @@
+import importlib.util
+import json
+from http.server import BaseHTTPRequestHandler
+import threading
+import os
+import sys
+from urllib.parse import urlparse
+
+# Single-function mode: rewrite /api/(.*) to /api/router in vercel.json and this
+# function serves every route. The route modules share the _core data cache,
+# so one warm instance holds one copy of the data for the whole API.
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, API_DIR)
+
+ROUTES = (
+    'hospitals', 'hospital-data', 'all-hospitals-data', 'benchmarks', 'distribution',
+    'peer-benchmarks', 'similar', 'rank', 'composite',
+)
+
+# Route modules load on first use, so a request only pays for the imports of its own route
+ROUTE_HANDLERS = {}
+ROUTE_LOCK = threading.Lock()
+
+def load_route(name):
+    spec = importlib.util.spec_from_file_location(f"route_{name.replace('-', '_')}", os.path.join(API_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+def route_handler(path):
+    """The handler class serving /api/<route>/..., or None"""
+    parts = [part for part in urlparse(path).path.split('/') if part]
+    name = parts[1] if len(parts) > 1 and parts[0] == 'api' else None
+    if name not in ROUTES:
+        return None
+    with ROUTE_LOCK:
+        if name not in ROUTE_HANDLERS:
+            ROUTE_HANDLERS[name] = load_route(name)
+        return ROUTE_HANDLERS[name]
+
+class handler(BaseHTTPRequestHandler):
+    def dispatch(self, method):
+        route = route_handler(self.path)
+        if route is None or not hasattr(route, method):
+            self.send_response(404)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": "Not found"}).encode())
+            return
+        # Serve this request as the route's own handler; restore ours for the next one on the connection
+        self.__class__ = route
+        try:
+            getattr(self, method)()
+        finally:
+            self.__class__ = handler
+
+    def do_GET(self):
+        self.dispatch('do_GET')
+
+    def do_POST(self):
+        self.dispatch('do_POST')
+
+    def do_OPTIONS(self):
+        self.dispatch('do_OPTIONS')
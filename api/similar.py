@@ -0,0 +1,84 @@
+import json
+from http.server import BaseHTTPRequestHandler
+import os
+import sys
+from urllib.parse import urlparse, parse_qs, unquote
+
+# Shared helpers live next to the handlers (underscore files are not deployed as routes);
+# the data modules are the backend's own, from backend/caremetrics
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [API_DIR, os.path.join(os.path.dirname(API_DIR), 'backend')]
+from _core import tables
+from caremetrics.peers import parse_peer_dimensions, peer_filters
+from caremetrics.records import normalize_facility_id
+from caremetrics.similarity import parse_neighbours
+
+def build_index():
+    return tables('labels', 'peers', 'similarity', 'id_index')
+
+def get_similar_hospitals(facility_id, params):
+    """(result, status, error) for the k hospitals closest to facility_id"""
+    lookup = build_index()
+    position = lookup['id_index'].get(normalize_facility_id(facility_id))
+    if position is None:
+        return None, 404, "Hospital not found"
+    cube = lookup['peers']
+    try:
+        group = cube.peer_group(position, parse_peer_dimensions(params['by'])) if params.get('by') else {}
+        group.update(peer_filters(params))
+        mask = cube.group_mask(group) if group else None
+        neighbours = lookup['similarity'].nearest(position, parse_neighbours(params.get('k')), mask)
+    except ValueError as e:
+        return None, 400, str(e)
+    labels = lookup['labels']
+    ids, names, states = labels.ids, labels.names, labels.states
+    return {
+        "facilityId": ids[position],
+        "name": names[position],
+        "group": group,
+        "similar": [
+            {"facilityId": ids[row], "name": names[row], "state": states[row],
+             "distance": round(distance, 3)}
+            for row, distance in neighbours
+        ],
+    }, 200, None
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            # /api/similar/<Facility ID>[?k=&by=&state=...]
+            parsed_url = urlparse(self.path)
+            params = {name: values[0] for name, values in parse_qs(parsed_url.query).items()}
+            path_parts = parsed_url.path.split('/')
+            facility_id = params.get('facilityId')
+            for i, part in enumerate(path_parts):
+                if part == 'similar' and i + 1 < len(path_parts) and path_parts[i + 1]:
+                    facility_id = unquote(path_parts[i + 1])
+                    break
+
+            if facility_id:
+                result, status, error = get_similar_hospitals(facility_id, params)
+            else:
+                result, status, error = None, 400, "Facility ID not provided"
+            self.send_response(status)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": error} if error else result).encode())
+        except Exception as e:
+            self.send_response(500)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+            self.wfile.write(json.dumps({"error": str(e)}).encode())
+    
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers() 
\ No newline at end of file
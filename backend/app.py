@@ -1,10 +1,26 @@
-import pandas as pd
-import requests
-import io
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import math
+from fastapi.responses import Response, StreamingResponse
+import threading
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from caremetrics.aggregation import aggregate_hcahps, friendly_metrics
+from caremetrics.columnar_cache import cached_frame
+from caremetrics.compact import COMPACT_MEDIA_TYPE, build_compact, wants_compact
+from caremetrics.composite import composite_rows, parse_weights
+from caremetrics.ingest import HCAHPS_SCHEMA, HOSPITAL_SCHEMA, frame_memory, ingest_variant, stream_csv
+from caremetrics.paging import build_page, iter_ndjson, parse_fields, parse_limit, wants_ndjson
+from caremetrics.peers import compare_to_peers, parse_peer_dimensions, peer_filters
+from caremetrics.ranking import parse_rank_query
+from caremetrics.records import build_all_hospitals
+from caremetrics.refresher import SourceRefresher
+from caremetrics.response_cache import ResponseCache, dumps
+from caremetrics.search import parse_result_limit
+from caremetrics.similarity import parse_neighbours
+from caremetrics.sources import HCAHPS_URL, HOSPITAL_URL, METRIC_IDS
+from loader import DataUnavailable, SingleFlightLoader
+from snapshot import build_snapshot
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -18,89 +34,106 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# S3 URLs for the CSVs
-HCAHPS_URL = 'https://hospital-benchmark-data.s3.us-east-1.amazonaws.com/HCAHPS.csv'
-HOSPITAL_URL = 'https://hospital-benchmark-data.s3.us-east-1.amazonaws.com/Hospital_General_Information.csv'
-
-# Metrics to benchmark (updated to match actual CSV data)
-METRIC_IDS = {
-    'H_COMP_1_A_P': 'Nurse Communication',
-    'H_COMP_2_A_P': 'Doctor Communication',
-    'H_COMP_3_A_P': 'Staff Responsiveness',
-    'H_CALL_BUTTON_A_P': 'Staff Responsiveness',
-    'H_BATH_HELP_A_P': 'Staff Responsiveness',
-    'H_SIDE_EFFECTS_A_P': 'Care Transition',
-    'H_DISCH_HELP_Y_P': 'Discharge Info',
-    'H_CLEAN_HSP_A_P': 'Care Cleanliness',
-    'H_QUIET_HSP_A_P': 'Quietness',
-    'H_RECMND_DY': 'Recommend'
-}
+# Friendly metric names in a stable order
+FRIENDLY_METRICS = friendly_metrics(METRIC_IDS)
 
 # Simple cache to avoid reloading every request
 DATA_CACHE = {}
 
-def fetch_csv(url):
-    resp = requests.get(url)
-    resp.raise_for_status()
-    return pd.read_csv(io.StringIO(resp.text), low_memory=False)
+# Benchmark snapshot derived from DATA_CACHE, rebuilt when the data version changes
+SNAPSHOT_CACHE = {}
+SNAPSHOT_LOCK = threading.Lock()
+
+# Encoded (and precompressed) bodies of the heavy endpoints, per data version
+RESPONSE_CACHE = ResponseCache()
+
+def fetch_csv(url, schema=None, usecols=False, measure_ids=None):
+    # Parsed frames are streamed from S3 and kept in a local columnar cache keyed by the S3 ETag
+    return cached_frame(
+        url,
+        lambda u: stream_csv(u, schema=schema, usecols=usecols, measure_ids=measure_ids),
+        variant=ingest_variant(schema, usecols, measure_ids),
+    )
+
+def set_source_data(hcahps, hospitals):
+    """Install new source frames and bump the data version"""
+    logger.info(f"Source data: hcahps {frame_memory(hcahps) / 1e6:.1f} MB, hospitals {frame_memory(hospitals) / 1e6:.1f} MB")
+    DATA_CACHE['hcahps'] = hcahps
+    DATA_CACHE['hospitals'] = hospitals
+    DATA_CACHE['version'] = DATA_CACHE.get('version', 0) + 1
+
+def fetch_source_data():
+    # Both files download and parse at once, so a cold load waits only for the slower one.
+    # Only the columns and measures the aggregation reads are kept
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='fetch') as pool:
+        hcahps = pool.submit(fetch_csv, HCAHPS_URL, schema=HCAHPS_SCHEMA, usecols=True, measure_ids=METRIC_IDS)
+        hospitals = pool.submit(fetch_csv, HOSPITAL_URL, schema=HOSPITAL_SCHEMA)
+        return hcahps.result(), hospitals.result()
+
+def load_source_data():
+    # Versions as of this load, so a release published during the download is picked up later
+    SOURCE_REFRESHER.prime()
+    set_source_data(*fetch_source_data())
+
+def refresh_source_data():
+    """Reload the CSVs and build their snapshot on the refresher thread, then swap both in together"""
+    if not DATA_LOADER.ready:
+        # Nothing is served yet; the first load will read the new release
+        return
+    hcahps, hospitals = fetch_source_data()
+    version = DATA_CACHE['version'] + 1
+    snapshot = build_snapshot(version, aggregate_hcahps(hcahps, METRIC_IDS), hospitals, FRIENDLY_METRICS)
+    with SNAPSHOT_LOCK:
+        SNAPSHOT_CACHE['current'] = snapshot
+        DATA_CACHE.update(hcahps=None, hospitals=hospitals, version=version)
+    logger.info(f"Swapped in benchmark snapshot for data version {version}")
+
+# One download at a time: concurrent cold requests wait for the same load
+DATA_LOADER = SingleFlightLoader(load_source_data)
+
+# Polls S3 for new CMS releases; requests keep the current snapshot while the next one builds
+SOURCE_REFRESHER = SourceRefresher((HCAHPS_URL, HOSPITAL_URL), refresh_source_data)
 
 def load_data():
-    if not DATA_CACHE:
-        hcahps = fetch_csv(HCAHPS_URL)
-        hospitals = fetch_csv(HOSPITAL_URL)
-        DATA_CACHE['hcahps'] = hcahps
-        DATA_CACHE['hospitals'] = hospitals
-    return DATA_CACHE['hcahps'], DATA_CACHE['hospitals']
-
-def aggregate_hcahps():
-    hcahps, hospitals = load_data()
-    
-    # Filter for relevant metrics and "Always" responses (A_P)
-    filtered = hcahps[hcahps['HCAHPS Measure ID'].isin(METRIC_IDS.keys())].copy()
-    
-    # Convert HCAHPS Answer Percent to numeric, handling errors
-    filtered['HCAHPS Answer Percent'] = pd.to_numeric(filtered['HCAHPS Answer Percent'], errors='coerce')
-    
-    # Remove rows with NaN values
-    filtered = filtered.dropna(subset=['HCAHPS Answer Percent'])
-    
-    # Group by hospital and metric, then average the percentages
-    grouped = filtered.groupby(['Facility ID', 'Facility Name', 'State', 'HCAHPS Measure ID'])['HCAHPS Answer Percent'].mean().reset_index()
-    
-    # Pivot to get one row per hospital, columns are HCAHPS Measure IDs
-    pivot = grouped.pivot_table(
-        index=['Facility ID', 'Facility Name', 'State'],
-        columns='HCAHPS Measure ID',
-        values='HCAHPS Answer Percent',
-        aggfunc='mean'
-    ).reset_index()
-    
-    # Fill NaN values with 0
-    pivot = pivot.fillna(0)
-    
-    # For each friendly metric name, average all columns that map to it
-    for friendly_name in set(METRIC_IDS.values()):
-        cols = [k for k, v in METRIC_IDS.items() if v == friendly_name]
-        if len(cols) > 1:
-            # Get all columns that exist in the pivot table
-            existing_cols = [col for col in cols if col in pivot.columns]
-            if existing_cols:
-                pivot[friendly_name] = pivot[existing_cols].mean(axis=1)
-            else:
-                pivot[friendly_name] = 0
-        elif len(cols) == 1:
-            if cols[0] in pivot.columns:
-                pivot[friendly_name] = pivot[cols[0]]
-            else:
-                pivot[friendly_name] = 0
-        else:
-            pivot[friendly_name] = 0
-    
-    # Only keep the friendly columns and the index columns
-    keep_cols = ['Facility ID', 'Facility Name', 'State'] + list(set(METRIC_IDS.values()))
-    pivot = pivot[keep_cols]
-    
-    return pivot, hospitals
+    if 'version' not in DATA_CACHE:
+        DATA_LOADER.ensure_loaded()
+
+def get_snapshot():
+    """Return the benchmark snapshot for the current data version"""
+    try:
+        load_data()
+    except DataUnavailable as e:
+        raise HTTPException(status_code=503, detail="Hospital data is not available yet",
+                            headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    snapshot = SNAPSHOT_CACHE.get('current')
+    if snapshot is not None and snapshot.version == DATA_CACHE['version']:
+        return snapshot
+    with SNAPSHOT_LOCK:
+        version = DATA_CACHE['version']
+        snapshot = SNAPSHOT_CACHE.get('current')
+        if snapshot is None or snapshot.version != version:
+            hcahps, hospitals = DATA_CACHE['hcahps'], DATA_CACHE['hospitals']
+            logger.info(f"Building benchmark snapshot for data version {version}")
+            snapshot = build_snapshot(version, aggregate_hcahps(hcahps, METRIC_IDS), hospitals, FRIENDLY_METRICS)
+            SNAPSHOT_CACHE['current'] = snapshot
+            # The raw measure rows are only needed to build the snapshot
+            if DATA_CACHE['version'] == version:
+                DATA_CACHE['hcahps'] = None
+            report = ", ".join(f"{name} {size / 1e6:.2f} MB" for name, size in snapshot.memory_report().items())
+            logger.info(f"Snapshot {version} memory: {report}")
+    return snapshot
+
+def cached_json_response(request, key, build, media_type="application/json", vary="Accept-Encoding"):
+    """Serve a snapshot-derived body from RESPONSE_CACHE with ETag and Accept-Encoding support"""
+    snapshot = get_snapshot()
+    entry = RESPONSE_CACHE.get(key, snapshot.version, lambda: build(snapshot))
+    headers = {"ETag": entry.etag, "Vary": vary, "Cache-Control": "no-cache"}
+    if entry.not_modified(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    body, encoding = entry.negotiate(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
 
 @app.on_event("startup")
 async def startup_event():
@@ -108,169 +141,255 @@ async def startup_event():
         logger.info("Starting up - loading data...")
         # Optionally, trigger your data loading here:
         # load_data()
+        SOURCE_REFRESHER.start()
         logger.info("Data loaded successfully!")
     except Exception as e:
         logger.error(f"Startup failed: {e}")
         raise e
 
 @app.get("/api/hospitals")
-def get_hospitals():
-    pivot, _ = aggregate_hcahps()
-    return {"hospitals": pivot['Facility Name'].dropna().unique().tolist()}
+def get_hospitals(request: Request, q: Optional[str] = None, limit: Optional[str] = None):
+    if q is not None:
+        return search_hospitals(q, limit)
+    return cached_json_response(request, "hospitals", lambda snapshot: {"hospitals": list(snapshot.hospital_names)})
+
+def search_hospitals(q, limit):
+    """Typeahead matches for q: Facility ID, name, city and state, best first"""
+    snapshot = get_snapshot()
+    try:
+        limit = parse_result_limit(limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"query": q, "results": snapshot.search.search(q, limit)}
+
+# Largest number of hospitals one batch request may ask for
+MAX_BATCH_SIZE = 100
+
+@app.post("/api/hospital-data/batch")
+def get_hospital_data_batch(body: dict = Body(...)):
+    """hospital-data for a list of {"facilityId"} / {"name"} items, in request order"""
+    items = body.get("hospitals")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail='Expected {"hospitals": [{"facilityId": ...} or {"name": ...}]}')
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} hospitals per request")
+    snapshot = get_snapshot()
+    return {"results": lookup_batch(snapshot, items)}
+
+def lookup_batch(snapshot, items):
+    positions = []
+    for item in items:
+        if isinstance(item, dict) and item.get("facilityId") is not None:
+            positions.append(snapshot.position_by_id(item["facilityId"]))
+        elif isinstance(item, dict) and item.get("name") is not None:
+            positions.append(snapshot.position_by_name(item["name"]))
+        else:
+            positions.append(None)
+    found = [p for p in positions if p is not None]
+    records = iter(snapshot.hospital_records(found))
+    ids, names = snapshot.labels.ids, snapshot.labels.names
+    return [
+        {"request": item, "found": True, "facilityId": ids[position], "name": names[position],
+         **next(records)}
+        if position is not None else
+        {"request": item, "found": False, "error": "Hospital not found"}
+        for item, position in zip(items, positions)
+    ]
+
+@app.get("/api/hospital-data/by-id/{facility_id}")
+def get_hospital_data_by_id(facility_id: str):
+    snapshot = get_snapshot()
+    position = snapshot.position_by_id(facility_id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+    return snapshot.hospital_record(position)
 
 @app.get("/api/hospital-data/{hospital_name}")
 def get_hospital_data(hospital_name: str):
-    pivot, hospitals = aggregate_hcahps()
-    row = pivot[pivot['Facility Name'] == hospital_name]
-    if row.empty:
+    snapshot = get_snapshot()
+    position = snapshot.position_by_name(hospital_name)
+    if position is None:
         raise HTTPException(status_code=404, detail="Hospital not found")
-    
-    info = hospitals[hospitals['Facility Name'] == hospital_name].iloc[0].to_dict() if not hospitals[hospitals['Facility Name'] == hospital_name].empty else {}
-    
-    # Calculate national averages for each metric
-    national_averages = {}
-    for col in METRIC_IDS.values():
-        if col in pivot.columns:
-            try:
-                vals = pd.to_numeric(pivot[col], errors='coerce').dropna()
-                if len(vals) > 0:
-                    national_averages[col] = float(vals.mean())
-                else:
-                    national_averages[col] = 75.0
-            except Exception:
-                national_averages[col] = 75.0
-    
-    # Calculate state average for the hospital's state
-    state = row.iloc[0]['State']
-    state_data = pivot[pivot['State'] == state]
-    state_averages = {}
-    for col in METRIC_IDS.values():
-        if col in state_data.columns:
-            try:
-                vals = pd.to_numeric(state_data[col], errors='coerce').dropna()
-                if len(vals) > 0:
-                    state_averages[col] = float(vals.mean())
-                else:
-                    state_averages[col] = 75.0
-            except Exception:
-                state_averages[col] = 75.0
-    
-    # Build metrics with proper structure
-    metrics = {}
-    for col in METRIC_IDS.values():
-        if col in row.columns and pd.notnull(row.iloc[0][col]):
-            hospital_val = float(row.iloc[0][col])
-            state_avg = state_averages.get(col, 75.0)
-            national_avg = national_averages.get(col, 75.0)
-            
-            metrics[col] = {
-                "hospital": hospital_val,
-                "state": state_avg,
-                "national": national_avg,
-                "vsState": round(hospital_val - state_avg, 1),
-                "vsNational": round(hospital_val - national_avg, 1)
-            }
-    
-    return {"info": info, "metrics": metrics}
+    return snapshot.hospital_record(position)
 
 @app.get("/api/all-hospitals-data")
-def get_all_hospitals_data():
-    pivot, hospitals = aggregate_hcahps()
-    all_data = {}
-    
-    # Calculate national averages for each metric
-    national_averages = {}
-    for col in METRIC_IDS.values():
-        if col in pivot.columns:
-            try:
-                vals = pd.to_numeric(pivot[col], errors='coerce').dropna()
-                if len(vals) > 0:
-                    national_averages[col] = float(vals.mean())
-                else:
-                    national_averages[col] = 75.0  # Default fallback
-            except Exception:
-                national_averages[col] = 75.0  # Default fallback
-    
-    # Calculate state averages for each metric
-    state_averages = {}
-    for state in pivot['State'].unique():
-        state_data = pivot[pivot['State'] == state]
-        state_averages[state] = {}
-        for col in METRIC_IDS.values():
-            if col in state_data.columns:
-                try:
-                    vals = pd.to_numeric(state_data[col], errors='coerce').dropna()
-                    if len(vals) > 0:
-                        state_averages[state][col] = float(vals.mean())
-                    else:
-                        state_averages[state][col] = 75.0  # Default fallback
-                except Exception:
-                    state_averages[state][col] = 75.0  # Default fallback
-    
-    # Process all hospitals
-    for _, row in pivot.iterrows():
-        name = row['Facility Name']
-        state = row['State']
-        info = hospitals[hospitals['Facility Name'] == name].iloc[0].to_dict() if not hospitals[hospitals['Facility Name'] == name].empty else {}
-        
-        # Clean info dict for JSON serialization
-        clean_info = {}
-        for k, v in info.items():
-            if isinstance(v, float) and (pd.isnull(v) or not math.isfinite(v)):
-                clean_info[k] = ''
-            elif isinstance(v, (int, float)):
-                clean_info[k] = v
-            else:
-                clean_info[k] = str(v) if v is not None else ''
-        
-        # Build metrics with proper structure
-        metrics = {}
-        for col in METRIC_IDS.values():
-            if col in row:
-                try:
-                    hospital_val = row[col]
-                    if pd.notnull(hospital_val) and hospital_val != '':
-                        fval = float(hospital_val)
-                        if math.isfinite(fval):
-                            state_avg = state_averages.get(state, {}).get(col, 75.0)
-                            national_avg = national_averages.get(col, 75.0)
-                            
-                            metrics[col] = {
-                                "hospital": fval,
-                                "state": state_avg,
-                                "national": national_avg,
-                                "vsState": round(fval - state_avg, 1),
-                                "vsNational": round(fval - national_avg, 1)
-                            }
-                except Exception:
-                    continue
-        
-        all_data[name] = {"info": clean_info, "metrics": metrics}
-    
-    return all_data
+def get_all_hospitals_data(request: Request, limit: Optional[str] = None, cursor: Optional[str] = None,
+                           state: Optional[str] = None, fields: Optional[str] = None,
+                           format: Optional[str] = None):
+    if wants_ndjson(format, request.headers.get("accept")):
+        return stream_all_hospitals(state, fields)
+    if any(param is not None for param in (limit, cursor, state, fields)):
+        return get_all_hospitals_page(limit, cursor, state, fields)
+    if wants_compact(format, request.headers.get("accept")):
+        return cached_json_response(
+            request, "all-hospitals-data:columns",
+            lambda snapshot: build_compact(snapshot.pivot, snapshot.hospitals, snapshot.averages),
+            media_type=COMPACT_MEDIA_TYPE, vary="Accept, Accept-Encoding",
+        )
+    return cached_json_response(
+        request, "all-hospitals-data",
+        lambda snapshot: build_all_hospitals(snapshot.labels, snapshot.info_records, snapshot.metric_records),
+        vary="Accept, Accept-Encoding",
+    )
+
+def get_all_hospitals_page(limit, cursor, state, fields):
+    """One page of hospitals in name order, optionally filtered by state and projected to fields"""
+    snapshot = get_snapshot()
+    try:
+        info_fields, metric_fields = parse_fields(fields, snapshot.hospitals.columns, snapshot.metrics)
+        positions, next_cursor, total = snapshot.page_index.page(parse_limit(limit), cursor, state)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page = {
+        "hospitals": build_page(snapshot.labels, snapshot.info_records, snapshot.metric_records,
+                                positions, info_fields, metric_fields),
+        "nextCursor": next_cursor,
+        "total": total,
+    }
+    return Response(content=dumps(page), media_type="application/json")
+
+def stream_all_hospitals(state, fields):
+    """Every hospital (optionally one state's) as NDJSON, serialized batch by batch"""
+    snapshot = get_snapshot()
+    try:
+        info_fields, metric_fields = parse_fields(fields, snapshot.hospitals.columns, snapshot.metrics)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lines = iter_ndjson(snapshot.labels, snapshot.info_records, snapshot.metric_records,
+                        snapshot.page_index.rows(state), info_fields, metric_fields)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.get("/api/distribution/{metric}")
+def get_distribution(metric: str, state: Optional[str] = None):
+    """Quantile cut points and histogram of a metric, nationally or for one state"""
+    snapshot = get_snapshot()
+    distribution = snapshot.distributions.get(metric)
+    if distribution is None:
+        raise HTTPException(status_code=404, detail="Metric not found")
+    summary = distribution.summary(state.strip().upper() if state else None)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="State not found")
+    return {"metric": metric, "state": state.strip().upper() if state else None, **summary}
+
+def peer_group_filters(state: Optional[str] = None, region: Optional[str] = None, type: Optional[str] = None,
+                       ownership: Optional[str] = None, emergency: Optional[str] = None) -> Dict[str, str]:
+    """Peer-group query parameters shared by the peer, similar, rank and composite routes"""
+    return peer_filters({"state": state, "region": region, "type": type, "ownership": ownership,
+                         "emergency": emergency})
+
+@app.get("/api/peer-benchmarks")
+def get_peer_benchmarks(filters: Dict[str, str] = Depends(peer_group_filters),
+                        facilityId: Optional[str] = None, by: Optional[str] = None):
+    """Metric means and counts for a peer group, given directly or as a hospital's own group on by= dimensions"""
+    snapshot = get_snapshot()
+    position = None
+    try:
+        if facilityId is not None:
+            position = snapshot.position_by_id(facilityId)
+            if position is None:
+                raise HTTPException(status_code=404, detail="Hospital not found")
+            group = snapshot.peers.peer_group(position, parse_peer_dimensions(by or "state"))
+        else:
+            group = filters
+        metrics = snapshot.peers.lookup(**group)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="No hospitals in this peer group")
+    if position is not None:
+        metrics = compare_to_peers(metrics, snapshot.metric_records[position])
+    return {"group": group, "metrics": metrics}
+
+@app.get("/api/similar/{facility_id}")
+def get_similar_hospitals(facility_id: str, k: Optional[str] = None, by: Optional[str] = None,
+                          filters: Dict[str, str] = Depends(peer_group_filters)):
+    """The k hospitals with the closest metric vectors, optionally within a state or peer group"""
+    snapshot = get_snapshot()
+    position = snapshot.position_by_id(facility_id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+    try:
+        group = snapshot.peers.peer_group(position, parse_peer_dimensions(by)) if by else {}
+        group.update(filters)
+        mask = snapshot.peers.group_mask(group) if group else None
+        neighbours = snapshot.similarity.nearest(position, parse_neighbours(k), mask)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ids, names, states = snapshot.labels.ids, snapshot.labels.names, snapshot.labels.states
+    return {
+        "facilityId": ids[position],
+        "name": names[position],
+        "group": group,
+        "similar": [
+            {"facilityId": ids[row], "name": names[row], "state": states[row],
+             "distance": round(distance, 3)}
+            for row, distance in neighbours
+        ],
+    }
+
+@app.get("/api/rank")
+def get_rank(metric: str, group: Dict[str, str] = Depends(peer_group_filters),
+             min: Optional[str] = None, max: Optional[str] = None, order: Optional[str] = None,
+             limit: Optional[str] = None, offset: Optional[str] = None):
+    """Leaderboard of one metric, optionally within a state or peer group and a value range (inclusive)"""
+    snapshot = get_snapshot()
+    try:
+        limit, offset, descending, minimum, maximum = parse_rank_query(limit, offset, order, min, max)
+        mask = snapshot.peers.group_mask(group) if group else None
+        rows, total = snapshot.ranking.top(metric, limit, descending, mask, minimum, maximum, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    column = snapshot.ranking.values[:, snapshot.ranking.metrics.index(metric)]
+    ids, names, states = snapshot.labels.ids, snapshot.labels.names, snapshot.labels.states
+    return {
+        "metric": metric,
+        "order": "desc" if descending else "asc",
+        "group": group,
+        "total": total,
+        "hospitals": [
+            {"rank": offset + i + 1, "facilityId": ids[row], "name": names[row],
+             "state": states[row], "value": float(column[row])}
+            for i, row in enumerate(rows.tolist())
+        ],
+    }
+
+@app.get("/api/composite")
+def get_composite(weights: Optional[str] = None, group: Dict[str, str] = Depends(peer_group_filters),
+                  limit: Optional[str] = None, offset: Optional[str] = None):
+    """Weighted composite score with national and in-state ranks and percentiles, best first
+
+    weights is "Metric:weight,..."; unlisted metrics get weight 0 and no weights means equal weights.
+    """
+    snapshot = get_snapshot()
+    try:
+        limit, offset, _, _, _ = parse_rank_query(limit, offset, None, None, None)
+        result = snapshot.composite.scores(parse_weights(weights))
+        rows = result.order
+        if group:
+            rows = rows[snapshot.peers.group_mask(group)[rows]]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "weights": result.weights,
+        "group": group,
+        "total": len(rows),
+        "hospitals": composite_rows(result, snapshot.labels, rows[offset:offset + limit]),
+    }
 
 @app.get("/api/benchmarks")
 def get_benchmarks():
-    pivot, _ = aggregate_hcahps()
-    benchmarks = {}
-    for col in METRIC_IDS.values():
-        if col in pivot.columns:
-            try:
-                # Ensure we have a Series, not DataFrame
-                if hasattr(pivot[col], 'iloc'):
-                    # It's a DataFrame column, get the first column
-                    series = pivot[col].iloc[:, 0] if pivot[col].shape[1] > 0 else pd.Series()
-                else:
-                    # It's already a Series
-                    series = pivot[col]
-                
-                # Convert to numeric and calculate mean
-                vals = pd.to_numeric(series, errors='coerce').dropna()
-                if len(vals) > 0:
-                    benchmarks[col] = float(vals.mean())
-            except Exception:
-                continue
-    return {"national": benchmarks}
+    snapshot = get_snapshot()
+    return {"national": dict(snapshot.averages.national)}
+
+@app.get("/api/status")
+def get_status():
+    snapshot = SNAPSHOT_CACHE.get('current')
+    return {
+        "load": DATA_LOADER.status(),
+        "refresh": SOURCE_REFRESHER.status(),
+        "dataVersion": DATA_CACHE.get('version'),
+        "snapshotVersion": snapshot.version if snapshot is not None else None,
+    }
 
 @app.get("/")
 async def root():
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the HealthMetrics Pro data pipeline
+
+Usage:
+    python benchmark.py aggregation --csv HCAHPS.csv
+"""
+
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+
+# Add the backend directory to Python path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from caremetrics.aggregation import aggregate_hcahps, friendly_metrics  # noqa: E402
+from caremetrics.sources import HCAHPS_URL, METRIC_IDS  # noqa: E402
+
+
+def legacy_aggregate_hcahps(hcahps, metric_ids):
+    """The groupby + pivot_table pipeline replaced by aggregation.aggregate_hcahps"""
+    filtered = hcahps[hcahps['HCAHPS Measure ID'].isin(metric_ids.keys())].copy()
+    filtered['HCAHPS Answer Percent'] = pd.to_numeric(filtered['HCAHPS Answer Percent'], errors='coerce')
+    filtered = filtered.dropna(subset=['HCAHPS Answer Percent'])
+    grouped = filtered.groupby(['Facility ID', 'Facility Name', 'State', 'HCAHPS Measure ID'])['HCAHPS Answer Percent'].mean().reset_index()
+    pivot = grouped.pivot_table(
+        index=['Facility ID', 'Facility Name', 'State'],
+        columns='HCAHPS Measure ID',
+        values='HCAHPS Answer Percent',
+        aggfunc='mean'
+    ).reset_index()
+    pivot = pivot.fillna(0)
+    for friendly_name in set(metric_ids.values()):
+        cols = [k for k, v in metric_ids.items() if v == friendly_name]
+        existing_cols = [col for col in cols if col in pivot.columns]
+        if existing_cols:
+            pivot[friendly_name] = pivot[existing_cols].mean(axis=1)
+        else:
+            pivot[friendly_name] = 0
+    keep_cols = ['Facility ID', 'Facility Name', 'State'] + friendly_metrics(metric_ids)
+    return pivot[keep_cols]
+
+
+def load_csv(path):
+    if path:
+        return pd.read_csv(path, low_memory=False)
+    print(f"Downloading {HCAHPS_URL} ...")
+    resp = requests.get(HCAHPS_URL, timeout=120)
+    resp.raise_for_status()
+    return pd.read_csv(io.StringIO(resp.text), low_memory=False)
+
+
+def best_of(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def compare_aggregations(legacy, vector):
+    """(same facilities, max abs metric difference) of the two pipelines' outputs"""
+    metrics = friendly_metrics(METRIC_IDS)
+    same_rows = len(legacy) == len(vector) and (legacy['Facility ID'].to_numpy() == vector['Facility ID'].to_numpy()).all()
+    max_diff = float(np.abs(legacy[metrics].to_numpy() - vector[metrics].to_numpy()).max()) if same_rows else float('nan')
+    return same_rows, max_diff
+
+
+def with_missing_keys(hcahps, every=97):
+    """A copy with a missing Facility ID, measure, name or state on every `every`-th row"""
+    damaged = hcahps.copy()
+    for offset, column in enumerate(['Facility ID', 'HCAHPS Measure ID', 'Facility Name', 'State']):
+        damaged.loc[damaged.index[offset::every], column] = np.nan
+    return damaged
+
+
+def bench_aggregation(args):
+    hcahps = load_csv(args.csv)
+    print(f"HCAHPS rows: {len(hcahps):,}")
+
+    legacy_time, legacy = best_of(lambda: legacy_aggregate_hcahps(hcahps, METRIC_IDS), args.repeat)
+    vector_time, vector = best_of(lambda: aggregate_hcahps(hcahps, METRIC_IDS), args.repeat)
+    same_rows, max_diff = compare_aggregations(legacy, vector)
+
+    print(f"Facilities: {len(vector):,}")
+    print(f"groupby + pivot_table: {legacy_time * 1000:8.1f} ms")
+    print(f"bincount + matmul:     {vector_time * 1000:8.1f} ms")
+    print(f"Speedup:               {legacy_time / vector_time:8.1f}x")
+    print(f"Same facilities: {same_rows}, max abs difference: {max_diff:.2e}")
+
+    # groupby drops rows with a NaN key; the vectorized path has to drop the same rows
+    damaged = with_missing_keys(hcahps)
+    missing_same, missing_diff = compare_aggregations(legacy_aggregate_hcahps(damaged, METRIC_IDS),
+                                                      aggregate_hcahps(damaged, METRIC_IDS))
+    print(f"With missing keys: same facilities: {missing_same}, max abs difference: {missing_diff:.2e}")
+    return 0 if same_rows and missing_same and missing_diff < 1e-9 else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HCAHPS data pipeline")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    aggregation = subparsers.add_parser('aggregation', help="pandas pivot vs vectorized aggregation")
+    aggregation.add_argument('--csv', help="Path to HCAHPS.csv (downloaded from S3 if omitted)")
+    aggregation.add_argument('--repeat', type=int, default=5)
+    aggregation.set_defaults(func=bench_aggregation)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""
+Data modules shared by the FastAPI backend and the Vercel functions.
+
+backend/app.py imports them from its own directory; the handlers in api/ put
+backend/ on sys.path, and .vercelignore ships this package (and nothing else
+of backend/) with the functions. The modules import pandas lazily (see lazy),
+so a function serving from the build-time artifact never loads it.
+"""
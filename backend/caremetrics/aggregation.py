@@ -0,0 +1,156 @@
+"""
+Vectorized HCAHPS aggregation engine.
+
+Facility IDs and measure IDs are integer-coded once, answer percents are
+accumulated into a dense facility x measure array with ``np.bincount`` and
+the measures are folded into the friendly metrics with a single matrix
+multiply. The result matches the groupby/pivot_table pipeline it replaces:
+measures a hospital did not report count as 0, and a friendly metric is the
+mean of its measures that appear anywhere in the data.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+INDEX_COLUMNS = ['Facility ID', 'Facility Name', 'State']
+
+# Fallback used when a metric has no values to average
+DEFAULT_AVERAGE = 75.0
+
+
+def friendly_metrics(metric_ids: Dict[str, str]) -> List[str]:
+    """Friendly metric names in a stable order"""
+    return list(dict.fromkeys(metric_ids.values()))
+
+
+def build_weight_matrix(measure_ids: Sequence[str], metric_ids: Dict[str, str],
+                        metrics: Sequence[str]) -> np.ndarray:
+    """Measure -> metric weights that average the measures of each metric"""
+    weights = np.zeros((len(measure_ids), len(metrics)))
+    for j, metric in enumerate(metrics):
+        rows = [i for i, measure in enumerate(measure_ids) if metric_ids.get(measure) == metric]
+        if rows:
+            weights[rows, j] = 1.0 / len(rows)
+    return weights
+
+
+def aggregate_hcahps(hcahps: pd.DataFrame, metric_ids: Dict[str, str]) -> pd.DataFrame:
+    """One row per facility with the friendly metric averages"""
+    measure_ids = list(metric_ids.keys())
+    metrics = friendly_metrics(metric_ids)
+
+    # Map every measure in the frame to its slot in measure_ids (-1 if unused)
+    codes, uniques = pd.factorize(hcahps['HCAHPS Measure ID'])
+    slot_lookup = np.array([measure_ids.index(m) if m in metric_ids else -1 for m in uniques] + [-1])
+    slots = slot_lookup[codes]
+
+    # Only convert the percent column for rows of the measures we keep
+    rows = np.flatnonzero(slots >= 0)
+    percent = pd.to_numeric(hcahps['HCAHPS Answer Percent'].iloc[rows], errors='coerce')
+    percent = percent.to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(percent)
+    rows, slots, percent = rows[valid], slots[rows[valid]], percent[valid]
+
+    # Drop rows missing a key, as groupby does; their -1 codes would break the flat index below
+    keyed = hcahps[['Facility ID', 'Facility Name', 'State']].iloc[rows].notna().all(axis=1).to_numpy()
+    rows, slots, percent = rows[keyed], slots[keyed], percent[keyed]
+
+    facility = hcahps['Facility ID'].iloc[rows]
+    if isinstance(facility.dtype, pd.CategoricalDtype):
+        # factorize sorts categoricals by category order; match the plain-string order
+        facility = facility.cat.reorder_categories(facility.cat.categories.sort_values())
+    facility_codes, facility_ids = pd.factorize(facility, sort=True)
+    n_facilities, n_measures = len(facility_ids), len(measure_ids)
+
+    # Accumulate sums and counts per (facility, measure) cell
+    flat = facility_codes * n_measures + slots
+    size = n_facilities * n_measures
+    sums = np.bincount(flat, weights=percent, minlength=size).reshape(n_facilities, n_measures)
+    counts = np.bincount(flat, minlength=size).reshape(n_facilities, n_measures)
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+    # Measures absent from the whole frame do not dilute their metric
+    present = counts.sum(axis=0) > 0
+    present_ids = [m for m, keep in zip(measure_ids, present) if keep]
+    weights = build_weight_matrix(present_ids, metric_ids, metrics)
+    values = means[:, present] @ weights
+
+    # Name and state come from the first row seen for each facility
+    _, first = np.unique(facility_codes, return_index=True)
+    first_rows = rows[first]
+
+    pivot = pd.DataFrame({
+        'Facility ID': facility_ids,
+        'Facility Name': hcahps['Facility Name'].iloc[first_rows].to_numpy(),
+        'State': hcahps['State'].iloc[first_rows].to_numpy(),
+    })
+    for j, metric in enumerate(metrics):
+        pivot[metric] = values[:, j]
+    return pivot
+
+
+@dataclass(frozen=True)
+class AverageTable:
+    """National and per-state means and counts for each friendly metric"""
+    metrics: tuple
+    states: tuple
+    state_index: Dict[str, int]
+    national_means: np.ndarray
+    national_counts: np.ndarray
+    state_means: np.ndarray
+    state_counts: np.ndarray
+    national: Dict[str, float]
+    by_state: Dict[str, Dict[str, float]]
+
+    def state(self, state) -> Dict[str, float]:
+        return self.by_state.get(state, {})
+
+
+def build_average_table(pivot: pd.DataFrame, metrics: Sequence[str],
+                        default: float = DEFAULT_AVERAGE) -> AverageTable:
+    """Compute every state and national average in one grouped reduction"""
+    metrics = tuple(metrics)
+    values = pivot[list(metrics)].to_numpy(dtype=float)
+    finite = np.isfinite(values)
+    clean = np.where(finite, values, 0.0)
+
+    state_codes, states = pd.factorize(pivot['State'])
+    has_state = state_codes >= 0
+    n_states, n_metrics = len(states), len(metrics)
+
+    # Sum and count every (state, metric) cell with a single bincount each
+    flat = (state_codes[has_state, None] * n_metrics + np.arange(n_metrics)).ravel()
+    size = n_states * n_metrics
+    state_sums = np.bincount(flat, weights=clean[has_state].ravel(), minlength=size).reshape(n_states, n_metrics)
+    state_counts = np.bincount(flat, weights=finite[has_state].ravel(), minlength=size).reshape(n_states, n_metrics).astype(np.int64)
+    state_means = np.divide(state_sums, state_counts, out=np.full(state_sums.shape, default), where=state_counts > 0)
+
+    national_counts = finite.sum(axis=0)
+    national_means = np.divide(clean.sum(axis=0), national_counts, out=np.full(n_metrics, default), where=national_counts > 0)
+
+    states = tuple(states)
+    national = {metric: float(national_means[j]) for j, metric in enumerate(metrics)}
+    by_state = {
+        state: {metric: float(state_means[i, j]) for j, metric in enumerate(metrics)}
+        for i, state in enumerate(states)
+    }
+
+    return AverageTable(
+        metrics=metrics,
+        states=states,
+        state_index={state: i for i, state in enumerate(states)},
+        national_means=national_means,
+        national_counts=national_counts,
+        state_means=state_means,
+        state_counts=state_counts,
+        national=national,
+        by_state=by_state,
+    )
@@ -0,0 +1,162 @@
+"""
+Columnar on-disk cache of the parsed CMS CSVs.
+
+Each parsed frame is written as one ``.npy`` file per column (text columns
+dictionary-encoded as integer codes plus a category array) under a directory
+named after the source URL and its content fingerprint (the S3 ETag). Later
+process starts issue a HEAD request, find the matching directory and
+memory-map the columns instead of downloading and parsing the CSV again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+import requests
+
+from .ingest import DOWNLOAD_TIMEOUT, http_session
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or the parse options change
+FORMAT_VERSION = 1
+
+CACHE_DIR = Path(os.getenv('CAREMETRICS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'caremetrics-cache')))
+
+
+def remote_fingerprint(url: str, timeout=DOWNLOAD_TIMEOUT) -> Optional[str]:
+    """Content fingerprint of a remote object from its ETag (or size + mtime)"""
+    resp = http_session().head(url, timeout=timeout, allow_redirects=True)
+    resp.raise_for_status()
+    tag = resp.headers.get('ETag') or '{}-{}'.format(resp.headers.get('Content-Length'), resp.headers.get('Last-Modified'))
+    return tag.strip('"')
+
+
+def _cache_prefix(url: str, variant: str = '') -> str:
+    name = Path(url.split('?')[0]).stem or 'frame'
+    return f"{name}-v{FORMAT_VERSION}{'-' + variant if variant else ''}-"
+
+
+def cache_path(url: str, fingerprint: str, cache_dir: Path = None, variant: str = '') -> Path:
+    digest = hashlib.sha1(f"{url}|{fingerprint}|{variant}".encode()).hexdigest()[:16]
+    return Path(cache_dir or CACHE_DIR) / f"{_cache_prefix(url, variant)}{digest}"
+
+
+def encode_columns(frame: pd.DataFrame) -> dict:
+    """Column name -> arrays (numeric as-is, text as codes + categories)"""
+    columns = {}
+    for col in frame.columns:
+        series = frame[col]
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            columns[col] = {'values': series.to_numpy()}
+        else:
+            codes, categories = pd.factorize(series)
+            categories = np.asarray(categories.astype(str), dtype=str)
+            codes = codes.astype(np.int32 if len(categories) > 32767 else np.int16)
+            columns[col] = {'codes': codes, 'categories': categories}
+    return columns
+
+
+def decode_columns(columns: dict, order) -> pd.DataFrame:
+    data = {}
+    for col in order:
+        arrays = columns[col]
+        if 'values' in arrays:
+            data[col] = arrays['values']
+        else:
+            data[col] = pd.Categorical.from_codes(arrays['codes'], categories=pd.Index(arrays['categories'], dtype=object))
+    return pd.DataFrame(data, columns=list(order))
+
+
+def to_columnar(frame: pd.DataFrame) -> pd.DataFrame:
+    """The in-memory form a frame has after a round trip through the cache"""
+    return decode_columns(encode_columns(frame), frame.columns)
+
+
+def save_frame(frame: pd.DataFrame, path: Path):
+    """Write a frame atomically as a directory of .npy columns"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=path.name + '.', dir=path.parent))
+    try:
+        manifest = {'format': FORMAT_VERSION, 'rows': len(frame), 'columns': []}
+        for i, (col, arrays) in enumerate(encode_columns(frame).items()):
+            entry = {'name': col, 'arrays': {}}
+            for kind, array in arrays.items():
+                filename = f"{i:03d}-{kind}.npy"
+                np.save(staging / filename, array, allow_pickle=False)
+                entry['arrays'][kind] = filename
+            manifest['columns'].append(entry)
+        (staging / 'manifest.json').write_text(json.dumps(manifest))
+        if path.exists():
+            shutil.rmtree(path, ignore_errors=True)
+        os.replace(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def load_frame(path: Path, mmap: bool = True) -> pd.DataFrame:
+    """Read a cached frame, memory-mapping the column files"""
+    path = Path(path)
+    manifest = json.loads((path / 'manifest.json').read_text())
+    columns = {}
+    for entry in manifest['columns']:
+        columns[entry['name']] = {
+            kind: np.load(path / filename, mmap_mode='r' if mmap else None, allow_pickle=False)
+            for kind, filename in entry['arrays'].items()
+        }
+    return decode_columns(columns, [entry['name'] for entry in manifest['columns']])
+
+
+def _latest_cached(url: str, cache_dir: Path, variant: str = '') -> Optional[Path]:
+    candidates = [p for p in Path(cache_dir).glob(_cache_prefix(url, variant) + '*') if (p / 'manifest.json').exists()]
+    return max(candidates, key=lambda p: p.stat().st_mtime) if candidates else None
+
+
+def _prune(url: str, keep: Path, cache_dir: Path, variant: str = ''):
+    for old in Path(cache_dir).glob(_cache_prefix(url, variant) + '*'):
+        if old != keep and old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def cached_frame(url: str, download: Callable[[str], pd.DataFrame], cache_dir: Path = None,
+                 variant: str = '') -> pd.DataFrame:
+    """Load url's frame from the columnar cache, downloading only on a new fingerprint
+
+    variant distinguishes frames parsed from the same URL with different options.
+    """
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    try:
+        fingerprint = remote_fingerprint(url)
+    except requests.RequestException as e:
+        # Offline or S3 hiccup: serve the newest snapshot we have, if any
+        latest = _latest_cached(url, cache_dir, variant)
+        if latest is None:
+            raise
+        logger.warning(f"Could not fingerprint {url} ({e}); using cached {latest.name}")
+        return load_frame(latest)
+
+    path = cache_path(url, fingerprint, cache_dir, variant)
+    if (path / 'manifest.json').exists():
+        try:
+            logger.info(f"Loading {url} from columnar cache {path}")
+            return load_frame(path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache {path}: {e}")
+
+    frame = download(url)
+    try:
+        save_frame(frame, path)
+        _prune(url, path, cache_dir, variant)
+        return load_frame(path)
+    except OSError as e:
+        logger.warning(f"Could not write columnar cache {path}: {e}")
+        return to_columnar(frame)
@@ -0,0 +1,85 @@
+"""
+Column-array ("compact") encoding of the all-hospitals payload.
+
+The nested payload repeats every metric's key strings and the state and
+national averages for each hospital. The compact form sends one array per
+column instead. Averages are sent once per state and once nationally, and
+low-cardinality info columns are dictionary-encoded. Facility ID, name and
+state are sent only as the top-level facilityId/name/state arrays, not again
+in info. Clients rebuild vsState/vsNational as round(value - average, 1),
+where a stateIndex of -1 means the default average.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .aggregation import DEFAULT_AVERAGE, AverageTable
+from .lazy import lazy_import
+from .records import clean_info_column, join_positions
+
+pd = lazy_import('pandas')
+
+COMPACT_FORMAT = 'columns'
+COMPACT_MEDIA_TYPE = 'application/vnd.caremetrics.columns+json'
+
+# Text columns with fewer distinct values than this share of rows are dictionary-encoded
+DICTIONARY_RATIO = 0.5
+
+# Info columns already sent as the facilityId/name/state arrays
+TOP_LEVEL_COLUMNS = ('Facility ID', 'Facility Name', 'State')
+
+
+def wants_compact(fmt: Optional[str], accept: Optional[str]) -> bool:
+    """?format=columns or an Accept header asking for the compact media type"""
+    if fmt:
+        return fmt.strip().lower() == COMPACT_FORMAT
+    return COMPACT_MEDIA_TYPE in (accept or '')
+
+
+def _nullable(values: np.ndarray, present: np.ndarray) -> list:
+    return [v if ok else None for v, ok in zip(values.tolist(), present.tolist())]
+
+
+def _encode_info_column(values: list, matched: np.ndarray) -> object:
+    values = [v if ok else None for v, ok in zip(values, matched.tolist())]
+    if any(isinstance(v, str) for v in values):
+        codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        if len(categories) < DICTIONARY_RATIO * max(len(values), 1):
+            return {"codes": codes.tolist(), "categories": categories.tolist()}
+    return values
+
+
+def build_compact(pivot: pd.DataFrame, hospitals: pd.DataFrame, averages: AverageTable,
+                  metrics: Sequence[str] = None) -> dict:
+    """All hospitals as parallel column arrays, in pivot order"""
+    metrics = list(metrics or averages.metrics)
+    columns = [averages.metrics.index(m) for m in metrics]
+
+    values = pivot[metrics].to_numpy(dtype=float)
+    finite = np.isfinite(values)
+    states = pivot['State'].tolist()
+    state_rows = [averages.state_index.get(s, -1) for s in states]
+
+    positions = join_positions(pivot, hospitals)
+    matched = positions >= 0
+    joined = hospitals.iloc[np.where(matched, positions, 0)] if len(hospitals) else hospitals
+    info = {col: _encode_info_column(clean_info_column(joined, col), matched)
+            for col in joined.columns if col not in TOP_LEVEL_COLUMNS}
+
+    return {
+        "format": COMPACT_FORMAT,
+        "metrics": metrics,
+        "defaultAverage": DEFAULT_AVERAGE,
+        "national": averages.national_means[columns].tolist(),
+        "states": list(averages.states),
+        "stateAverages": averages.state_means[:, columns].tolist(),
+        "facilityId": pivot['Facility ID'].astype(str).tolist(),
+        "name": pivot['Facility Name'].tolist(),
+        "state": states,
+        "stateIndex": state_rows,
+        "values": {metric: _nullable(values[:, j], finite[:, j]) for j, metric in enumerate(metrics)},
+        "info": info,
+    }
@@ -0,0 +1,194 @@
+"""
+Weighted composite patient-experience score.
+
+Scores for every hospital come from one matrix-vector product of the
+snapshot's metric matrix with a normalized weight vector. A missing metric
+drops out of that hospital's weighted mean. National and in-state ranks and
+percentiles are derived with sorts over the score vector. Results are
+memoized per weight vector in a bounded LRU, since dashboards reuse a
+handful of weightings.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .lazy import lazy_import
+from .records import FacilityLabels
+
+pd = lazy_import('pandas')
+
+COMPOSITE_CACHE_SIZE = 32
+
+
+@dataclass(frozen=True)
+class CompositeScores:
+    """Scores, ranks (1 = best) and percentiles of every pivot row for one weighting
+
+    order lists the scored rows best first; rows without any metric have no
+    score, rank 0 and NaN percentiles.
+    """
+    weights: Dict[str, float]
+    scores: np.ndarray
+    national_rank: np.ndarray
+    state_rank: np.ndarray
+    national_percentile: np.ndarray
+    state_percentile: np.ndarray
+    order: np.ndarray
+
+
+def _mid_percentiles(sorted_keys: np.ndarray, keys: np.ndarray, group_start: np.ndarray,
+                     group_size: np.ndarray) -> np.ndarray:
+    below = np.searchsorted(sorted_keys, keys, side='left') - group_start
+    at_or_below = np.searchsorted(sorted_keys, keys, side='right') - group_start
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (below + at_or_below) / 2 / group_size * 100
+
+
+@dataclass(frozen=True)
+class CompositeModel:
+    """Metric matrix and state codes of the pivot, with an LRU of computed weightings"""
+    metrics: tuple
+    values: np.ndarray
+    finite: np.ndarray
+    state_codes: np.ndarray
+    cache_size: int = COMPOSITE_CACHE_SIZE
+    _cache: OrderedDict = field(default_factory=OrderedDict, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __getstate__(self):
+        # The LRU and its lock belong to one process; a pickled model starts with an empty cache
+        return {name: getattr(self, name) for name in ('metrics', 'values', 'finite', 'state_codes', 'cache_size')}
+
+    def __setstate__(self, state):
+        for name, value in {**state, '_cache': OrderedDict(), '_lock': threading.Lock()}.items():
+            object.__setattr__(self, name, value)
+
+    def normalize_weights(self, weights: Optional[Dict[str, float]]) -> Tuple[float, ...]:
+        """Weight per metric in self.metrics order, summing to 1 (equal weights when None)"""
+        if not weights:
+            return tuple(1 / len(self.metrics) for _ in self.metrics)
+        unknown = set(weights) - set(self.metrics)
+        if unknown:
+            raise ValueError(f"Unknown metric: {', '.join(sorted(unknown))}")
+        if any(not np.isfinite(w) or w < 0 for w in weights.values()):
+            raise ValueError("Weights must be non-negative numbers")
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("At least one weight must be positive")
+        return tuple(weights.get(m, 0.0) / total for m in self.metrics)
+
+    def scores(self, weights: Optional[Dict[str, float]] = None) -> CompositeScores:
+        key = self.normalize_weights(weights)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        result = self._compute(key)
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _compute(self, key: Tuple[float, ...]) -> CompositeScores:
+        w = np.array(key)
+        # Weighted mean over each hospital's available metrics
+        covered = self.finite @ w
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = np.where(covered > 0, np.where(self.finite, self.values, 0.0) @ w / covered, np.nan)
+        # Equal weighted means reached through different sums must tie, not differ in the last bit
+        scores = np.round(scores, 9)
+        scored = np.isfinite(scores)
+        n = len(scores)
+
+        national_rank = np.zeros(n, dtype=np.int64)
+        order = np.flatnonzero(scored)[np.argsort(-scores[scored], kind='stable')]
+        national_rank[order] = np.arange(1, len(order) + 1)
+        sorted_scores = np.sort(scores[scored])
+        national_percentile = np.full(n, np.nan)
+        national_percentile[scored] = _mid_percentiles(sorted_scores, scores[scored], 0, len(sorted_scores))
+
+        # Rank within state: sort by (state, -score), then subtract each state's start
+        state_rank = np.zeros(n, dtype=np.int64)
+        state_percentile = np.full(n, np.nan)
+        in_state = scored & (self.state_codes >= 0)
+        rows = np.flatnonzero(in_state)
+        if len(rows):
+            codes = self.state_codes[rows]
+            by_state = rows[np.lexsort((-scores[rows], codes))]
+            sorted_codes = self.state_codes[by_state]
+            starts = np.searchsorted(sorted_codes, sorted_codes, side='left')
+            state_rank[by_state] = np.arange(len(by_state)) - starts + 1
+
+            # Percentiles compare (state, score) keys within each state's block
+            span = np.nanmax(np.abs(scores[rows])) * 2 + 1
+            keys = codes * span + scores[rows]
+            sorted_keys = np.sort(keys)
+            group_start = np.searchsorted(sorted_codes, codes, side='left')
+            group_size = np.searchsorted(sorted_codes, codes, side='right') - group_start
+            state_percentile[rows] = _mid_percentiles(sorted_keys, keys, group_start, group_size)
+
+        return CompositeScores(
+            weights=dict(zip(self.metrics, key)),
+            scores=scores,
+            national_rank=national_rank,
+            state_rank=state_rank,
+            national_percentile=national_percentile,
+            state_percentile=state_percentile,
+            order=order,
+        )
+
+
+def build_composite_model(pivot: pd.DataFrame, metrics: Sequence[str], values: np.ndarray) -> CompositeModel:
+    """Model over an existing facility x metric matrix (the rank index's, so it is not copied)"""
+    metrics = tuple(metrics)
+    state_codes, _ = pd.factorize(pivot['State'])
+    return CompositeModel(metrics=metrics, values=values, finite=np.isfinite(values), state_codes=state_codes)
+
+
+def parse_weights(weights: Optional[str]) -> Optional[Dict[str, float]]:
+    """'Nurse Communication:2,Recommend:1' -> {metric: weight}"""
+    if not weights:
+        return None
+    parsed = {}
+    for part in weights.split(','):
+        if not part.strip():
+            continue
+        metric, sep, value = part.rpartition(':')
+        if not sep or not metric.strip():
+            raise ValueError(f"Expected metric:weight, got {part.strip()!r}")
+        try:
+            parsed[metric.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight for {metric.strip()}: {value!r}")
+    return parsed
+
+
+def composite_rows(result: CompositeScores, labels: FacilityLabels, rows: np.ndarray) -> list:
+    """Response items for the given pivot rows"""
+    ids, names, states = labels.ids, labels.names, labels.states
+
+    def number(value, digits):
+        return round(float(value), digits) if np.isfinite(value) else None
+
+    return [
+        {
+            "facilityId": ids[row],
+            "name": names[row],
+            "state": states[row],
+            "score": number(result.scores[row], 2),
+            "nationalRank": int(result.national_rank[row]) or None,
+            "stateRank": int(result.state_rank[row]) or None,
+            "nationalPercentile": number(result.national_percentile[row], 1),
+            "statePercentile": number(result.state_percentile[row], 1),
+        }
+        for row in rows.tolist()
+    ]
@@ -0,0 +1,143 @@
+"""
+Per-metric value distributions for percentile ranks and distribution benchmarks.
+
+Each friendly metric keeps its hospital values sorted, nationally and per
+state, so a hospital's percentile rank is two binary searches. Quantile cut
+points and histograms are computed once per snapshot.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Metrics are percentages, so the histogram uses fixed 0-100 bins
+HISTOGRAM_EDGES = np.linspace(0.0, 100.0, 21)
+
+
+def percentile_rank(sorted_values: np.ndarray, value: float) -> Optional[float]:
+    """Percent of values below value, counting ties as half (None for an empty set)"""
+    return percentile_ranks(sorted_values, np.array([value], dtype=float))[0]
+
+
+def percentile_ranks(sorted_values: np.ndarray, values: np.ndarray) -> List[Optional[float]]:
+    """percentile_rank of every value with one pair of searchsorted calls"""
+    n = len(sorted_values)
+    if n == 0:
+        return [None] * len(values)
+    below = np.searchsorted(sorted_values, values, side='left')
+    at_or_below = np.searchsorted(sorted_values, values, side='right')
+    ranks = ((below + at_or_below) / 2 / n * 100).tolist()
+    return [round(r, 1) if np.isfinite(v) else None for r, v in zip(ranks, values.tolist())]
+
+
+def summarize(sorted_values: np.ndarray) -> dict:
+    """Count, mean, range, quantile cut points and histogram of a sorted array"""
+    if len(sorted_values) == 0:
+        return {"count": 0, "mean": None, "min": None, "max": None, "quantiles": {},
+                "histogram": {"edges": HISTOGRAM_EDGES.tolist(), "counts": [0] * (len(HISTOGRAM_EDGES) - 1)}}
+    cuts = np.quantile(sorted_values, QUANTILES)
+    counts, _ = np.histogram(np.clip(sorted_values, HISTOGRAM_EDGES[0], HISTOGRAM_EDGES[-1]), bins=HISTOGRAM_EDGES)
+    return {
+        "count": int(len(sorted_values)),
+        "mean": float(sorted_values.mean()),
+        "min": float(sorted_values[0]),
+        "max": float(sorted_values[-1]),
+        "quantiles": {f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, cuts)},
+        "histogram": {"edges": HISTOGRAM_EDGES.tolist(), "counts": counts.tolist()},
+    }
+
+
+@dataclass(frozen=True)
+class MetricDistribution:
+    """Sorted values and precomputed summaries of one metric"""
+    metric: str
+    national: np.ndarray
+    by_state: Dict[str, np.ndarray]
+    national_summary: dict
+    state_summaries: Dict[str, dict]
+
+    def percentile(self, value: float, state=None) -> Optional[float]:
+        """National percentile rank, or in-state when state is given"""
+        if state is None:
+            return percentile_rank(self.national, value)
+        values = self.by_state.get(state)
+        return percentile_rank(values, value) if values is not None else None
+
+    def summary(self, state=None) -> Optional[dict]:
+        if state is None:
+            return self.national_summary
+        return self.state_summaries.get(state)
+
+
+def build_distributions(pivot: pd.DataFrame, metrics: Sequence[str]) -> Dict[str, MetricDistribution]:
+    """Sort every metric once, then split the sorted order by state"""
+    state_codes, states = pd.factorize(pivot['State'])
+    distributions = {}
+    for metric in metrics:
+        values = pivot[metric].to_numpy(dtype=float)
+        finite = np.isfinite(values)
+        order = np.argsort(values[finite], kind='stable')
+        sorted_values = values[finite][order]
+        sorted_codes = state_codes[finite][order]
+        # A stable sort by state keeps each state's slice in value order
+        by_code = np.argsort(sorted_codes, kind='stable')
+        bounds = np.searchsorted(sorted_codes[by_code], np.arange(len(states) + 1))
+        by_state = {
+            state: sorted_values[by_code[bounds[i]:bounds[i + 1]]]
+            for i, state in enumerate(states)
+        }
+        distributions[metric] = MetricDistribution(
+            metric=metric,
+            national=sorted_values,
+            by_state=by_state,
+            national_summary=summarize(sorted_values),
+            state_summaries={state: summarize(values) for state, values in by_state.items()},
+        )
+    return distributions
+
+
+def percentile_fields(distributions: Dict[str, MetricDistribution], metrics: Dict[str, dict],
+                      state) -> Dict[str, dict]:
+    """A hospital's metric records with nationalPercentile/statePercentile added"""
+    return percentile_fields_batch(distributions, [metrics], [state])[0]
+
+
+def percentile_fields_batch(distributions: Dict[str, MetricDistribution], records: Sequence[Dict[str, dict]],
+                            states: Sequence) -> List[Dict[str, dict]]:
+    """percentile_fields for many hospitals, ranking each metric's values together"""
+    # Rows of each state, grouped once for all metrics
+    grouped: Dict[object, List[int]] = {}
+    for i, state in enumerate(states):
+        grouped.setdefault(state, []).append(i)
+    state_rows = [(state, np.array(rows)) for state, rows in grouped.items()]
+
+    ranks = {}
+    for metric, distribution in distributions.items():
+        values = np.array([r[metric]["hospital"] if metric in r else np.nan for r in records], dtype=float)
+        state_ranks: List[Optional[float]] = [None] * len(records)
+        for state, rows in state_rows:
+            state_values = distribution.by_state.get(state)
+            if state_values is not None:
+                for i, rank in zip(rows.tolist(), percentile_ranks(state_values, values[rows])):
+                    state_ranks[i] = rank
+        ranks[metric] = (percentile_ranks(distribution.national, values), state_ranks)
+    return [
+        {
+            metric: {
+                **record,
+                "nationalPercentile": ranks[metric][0][i],
+                "statePercentile": ranks[metric][1][i],
+            } if metric in ranks else record
+            for metric, record in metrics.items()
+        }
+        for i, metrics in enumerate(records)
+    ]
@@ -0,0 +1,223 @@
+"""
+Streaming, schema-driven CSV ingestion for the CMS files.
+
+The HTTP body is parsed straight from the socket in chunks, keeping only the
+declared columns and the requested measure rows as it goes, so the full
+response text and an unfiltered DataFrame of every HCAHPS measure are never
+held in memory. Key columns become categoricals and percent columns are
+parsed to floats once, with the CMS "Not Available" sentinel as NaN.
+
+Downloads share one pooled Session with bounded timeouts and retry with
+backoff. A large file can optionally be fetched as byte ranges on parallel
+connections (CAREMETRICS_DOWNLOAD_PARTS) and parsed once it is complete.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional, TypeVar
+
+import pandas as pd
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter, Retry
+
+logger = logging.getLogger(__name__)
+
+# Column -> 'category' | 'str' | 'percent'
+HCAHPS_SCHEMA = {
+    'Facility ID': 'category',
+    'Facility Name': 'category',
+    'State': 'category',
+    'HCAHPS Measure ID': 'category',
+    'HCAHPS Answer Percent': 'percent',
+}
+
+# Hospital info keeps every column; these only override the inferred dtypes
+HOSPITAL_SCHEMA = {
+    'Facility ID': 'str',
+    'State': 'category',
+    'Hospital Type': 'category',
+    'Hospital Ownership': 'category',
+    'Emergency Services': 'category',
+}
+
+# CMS sentinels for missing percents
+NOT_AVAILABLE = ['Not Available', 'Not Applicable']
+
+CHUNK_ROWS = 50_000
+
+# (connect, read) seconds: a dead endpoint fails fast, a slow body gets time per read
+DOWNLOAD_TIMEOUT = (10, 120)
+# Attempts per request, with exponential backoff between them
+DOWNLOAD_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5
+# Connections kept per host: both CSVs plus the parts of a ranged download
+POOL_SIZE = 8
+
+# Byte ranges fetched in parallel per large file; 1 streams it in one request
+DOWNLOAD_PARTS = int(os.getenv('CAREMETRICS_DOWNLOAD_PARTS', 1))
+# Smaller files are always streamed in one request
+MIN_RANGED_BYTES = 8 * 1024 * 1024
+
+T = TypeVar('T')
+
+
+@lru_cache(maxsize=None)
+def http_session() -> requests.Session:
+    """Process-wide Session: pooled keep-alive connections, retrying connect errors and 5xx with backoff"""
+    retry = Retry(total=DOWNLOAD_ATTEMPTS - 1, backoff_factor=RETRY_BACKOFF,
+                  status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('HEAD', 'GET'),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def with_retries(fn: Callable[[], T], what: str, attempts: int = DOWNLOAD_ATTEMPTS) -> T:
+    """fn(), run again with exponential backoff when the connection fails midway through a body"""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except requests.HTTPError:
+            # Status retries already happened in the adapter
+            raise
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            if attempt == attempts - 1:
+                raise
+            delay = RETRY_BACKOFF * 2 ** attempt
+            logger.warning(f"{what} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def ingest_variant(schema: Optional[Dict[str, str]] = None, usecols: bool = False,
+                   measure_ids: Optional[Iterable[str]] = None) -> str:
+    """Short key describing the parse options, for cache naming"""
+    if not schema and measure_ids is None:
+        return ''
+    spec = '|'.join([
+        ','.join(f"{col}:{kind}" for col, kind in (schema or {}).items()),
+        str(usecols),
+        ','.join(sorted(measure_ids or [])),
+    ])
+    return hashlib.sha1(spec.encode()).hexdigest()[:8]
+
+
+def _apply_schema(frame: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    for col, kind in schema.items():
+        if col not in frame.columns:
+            continue
+        if kind == 'category':
+            frame[col] = frame[col].astype('category')
+        elif kind == 'percent':
+            frame[col] = pd.to_numeric(frame[col], errors='coerce').astype('float64')
+    return frame
+
+
+def parse_csv(source, schema: Optional[Dict[str, str]] = None, usecols: bool = False,
+              measure_ids: Optional[Iterable[str]] = None,
+              chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Parse a CSV path or file object chunk by chunk
+
+    schema declares column dtypes; with usecols only those columns are read.
+    measure_ids keeps only the rows of those HCAHPS measures.
+    """
+    schema = schema or {}
+    measure_ids = set(measure_ids) if measure_ids is not None else None
+    percent_cols = [col for col, kind in schema.items() if kind == 'percent']
+    parts = []
+    # Everything declared parses as text first so every chunk has the same dtypes
+    reader = pd.read_csv(
+        source,
+        usecols=list(schema) if usecols else None,
+        dtype={col: str for col in schema},
+        na_values={col: NOT_AVAILABLE for col in percent_cols},
+        chunksize=chunksize,
+        low_memory=False,
+    )
+    for chunk in reader:
+        if measure_ids is not None:
+            chunk = chunk[chunk['HCAHPS Measure ID'].isin(measure_ids)]
+        parts.append(chunk)
+    if not parts:
+        return pd.DataFrame(columns=list(schema) if usecols else [])
+    return _apply_schema(pd.concat(parts, ignore_index=True), schema)
+
+
+def ranged_size(url: str) -> Optional[int]:
+    """Size of url's body when the server serves byte ranges of it, else None"""
+    resp = http_session().head(url, timeout=DOWNLOAD_TIMEOUT, allow_redirects=True)
+    resp.raise_for_status()
+    # Ranges of a content-encoded body would split the compressed stream
+    if resp.headers.get('Accept-Ranges') != 'bytes' or resp.headers.get('Content-Encoding'):
+        return None
+    try:
+        return int(resp.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def download_ranges(url: str, size: int, parts: int, path: str):
+    """Write url's body to path as `parts` byte ranges fetched on parallel pooled connections"""
+    bounds = [(size * i // parts, size * (i + 1) // parts - 1) for i in range(parts)]
+    with open(path, 'wb') as f:
+        f.truncate(size)
+
+    def fetch(start: int, end: int):
+        headers = {'Range': f"bytes={start}-{end}"}
+        with http_session().get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as resp:
+            resp.raise_for_status()
+            if resp.status_code != 206:
+                raise requests.HTTPError(f"Expected 206 for {headers['Range']}, got {resp.status_code}", response=resp)
+            written = 0
+            with open(path, 'r+b') as f:
+                f.seek(start)
+                for block in resp.iter_content(1 << 20):
+                    written += f.write(block)
+            if written != end - start + 1:
+                raise requests.ConnectionError(f"Range {start}-{end} ended after {written} bytes")
+
+    with ThreadPoolExecutor(max_workers=parts, thread_name_prefix='range') as pool:
+        futures = [pool.submit(with_retries, lambda s=start, e=end: fetch(s, e), f"Range {start}-{end} of {url}")
+                   for start, end in bounds]
+        for future in futures:
+            future.result()
+
+
+def stream_csv(url: str, schema: Optional[Dict[str, str]] = None, usecols: bool = False,
+               measure_ids: Optional[Iterable[str]] = None,
+               chunksize: int = CHUNK_ROWS, parts: int = DOWNLOAD_PARTS) -> pd.DataFrame:
+    """Download and parse a CSV chunk by chunk (see parse_csv)
+
+    With parts > 1 a large file that supports byte ranges is downloaded as
+    parallel ranges into a temporary file first, then parsed from it.
+    """
+    options = dict(schema=schema, usecols=usecols, measure_ids=measure_ids, chunksize=chunksize)
+    size = ranged_size(url) if parts > 1 else None
+    if size is not None and size >= MIN_RANGED_BYTES:
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        try:
+            download_ranges(url, size, parts, path)
+            return parse_csv(path, **options)
+        finally:
+            os.remove(path)
+
+    def download():
+        with http_session().get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as resp:
+            resp.raise_for_status()
+            resp.raw.decode_content = True
+            return parse_csv(resp.raw, **options)
+
+    return with_retries(download, f"Download of {url}")
+
+
+def frame_memory(frame: pd.DataFrame) -> int:
+    """Deep memory footprint of a DataFrame in bytes"""
+    return int(frame.memory_usage(deep=True).sum())
@@ -0,0 +1,36 @@
+"""
+Deferred imports for the shared data modules.
+
+Importing pandas is the largest part of a Vercel cold start, yet a function
+serving from the build-time artifact never calls it: pandas only builds
+tables. The modules of this package therefore bind it with lazy_import, which
+imports the module on first attribute access, i.e. only when data is rebuilt
+from the raw CSVs. They also postpone annotations, so `pd.DataFrame` hints do
+not import it. The FastAPI backend imports pandas anyway and is unaffected.
+"""
+
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        value = getattr(self._module, attr)
+        # Later lookups of the same attribute skip __getattr__
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self):
+        state = 'imported' if self._module is not None else 'not imported'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
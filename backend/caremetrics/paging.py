@@ -0,0 +1,173 @@
+"""
+Cursor pagination and field projection for the all-hospitals payload.
+
+Pivot rows are sorted once per snapshot by normalized Facility Name (then
+Facility ID), globally and per state, so a page is a binary search for the
+cursor plus a slice. Cursors carry the last sort key rather than an offset,
+so they stay valid across data reloads. The same rows can be streamed as
+NDJSON, one hospital per line, without building the whole payload.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .lazy import lazy_import
+from .records import FacilityLabels, facility_keys, normalize_name
+from .response_cache import dumps
+
+pd = lazy_import('pandas')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Hospitals serialized per NDJSON chunk
+NDJSON_BATCH = 256
+
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + '=' * (-len(cursor) % 4), altchars=b'-_', validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def normalize_state(state) -> str:
+    return str(state).strip().upper()
+
+
+@dataclass(frozen=True)
+class PageIndex:
+    """Pivot rows in name order, overall and per state"""
+    keys: tuple
+    positions: np.ndarray
+    by_state: Dict[str, Tuple[tuple, np.ndarray]]
+
+    def _select(self, state: Optional[str]) -> Tuple[tuple, np.ndarray]:
+        if state:
+            return self.by_state.get(normalize_state(state), ((), self.positions[:0]))
+        return self.keys, self.positions
+
+    def rows(self, state: Optional[str] = None) -> np.ndarray:
+        """Every pivot row in name order, optionally for one state"""
+        return self._select(state)[1]
+
+    def page(self, limit: int, cursor: Optional[str] = None,
+             state: Optional[str] = None) -> Tuple[np.ndarray, Optional[str], int]:
+        """(pivot rows, next cursor or None, total rows matching the filter)"""
+        keys, positions = self._select(state)
+        start = bisect_right(keys, decode_cursor(cursor)) if cursor else 0
+        end = min(start + limit, len(keys))
+        next_cursor = encode_cursor(keys[end - 1]) if end < len(keys) else None
+        return positions[start:end], next_cursor, len(keys)
+
+
+def build_page_index(pivot: pd.DataFrame) -> PageIndex:
+    names = [normalize_name(name) if pd.notna(name) else '' for name in pivot['Facility Name'].tolist()]
+    keys = [f"{name}\x00{fid}" for name, fid in zip(names, facility_keys(pivot['Facility ID']))]
+    order = np.array(sorted(range(len(keys)), key=keys.__getitem__), dtype=np.int64)
+    sorted_keys = np.array([keys[i] for i in order], dtype=object)
+
+    states = np.array([normalize_state(s) if pd.notna(s) else '' for s in pivot['State'].tolist()], dtype=object)[order]
+    by_state = {}
+    for state in pd.unique(states):
+        if state:
+            mask = states == state
+            by_state[state] = (tuple(sorted_keys[mask].tolist()), order[mask])
+
+    return PageIndex(keys=tuple(sorted_keys.tolist()), positions=order, by_state=by_state)
+
+
+def parse_limit(limit, default: int = DEFAULT_PAGE_SIZE) -> int:
+    if limit is None or limit == '':
+        return default
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_fields(fields: Optional[str], info_columns: Sequence[str],
+                 metrics: Sequence[str]) -> Tuple[Optional[List[str]], Optional[List[str]]]:
+    """Split a fields= list into (info columns, metrics); None keeps everything
+
+    "info" and "metrics" select the whole group; any other name must be an
+    info column or a metric.
+    """
+    if not fields:
+        return None, None
+    info_fields: Optional[List[str]] = []
+    metric_fields: Optional[List[str]] = []
+    for name in (f.strip() for f in fields.split(',')):
+        if not name:
+            continue
+        if name == 'info':
+            info_fields = None
+        elif name == 'metrics':
+            metric_fields = None
+        elif name in metrics:
+            if metric_fields is not None:
+                metric_fields.append(name)
+        elif name in info_columns:
+            if info_fields is not None:
+                info_fields.append(name)
+        else:
+            raise ValueError(f"Unknown field: {name}")
+    return info_fields, metric_fields
+
+
+def _project(record: dict, keys: Optional[List[str]]) -> dict:
+    if keys is None:
+        return record
+    return {key: record[key] for key in keys if key in record}
+
+
+def build_page(labels: FacilityLabels, info_records: Sequence[dict], metric_records: Sequence[dict],
+               positions: np.ndarray, info_fields: Optional[List[str]] = None,
+               metric_fields: Optional[List[str]] = None, info_state: bool = False) -> List[dict]:
+    """Projected {facilityId, name, state, info, metrics} items for the given pivot rows"""
+    items = []
+    for position in positions.tolist():
+        fid, name, state = labels.ids[position], labels.names[position], labels.states[position]
+        info = _project(info_records[position], info_fields)
+        if info_state:
+            info = {**info, 'state': state}
+        items.append({
+            "facilityId": fid,
+            "name": name,
+            "state": state,
+            "info": info,
+            "metrics": _project(metric_records[position], metric_fields),
+        })
+    return items
+
+
+def iter_ndjson(labels: FacilityLabels, info_records: Sequence[dict], metric_records: Sequence[dict],
+                positions: np.ndarray, info_fields: Optional[List[str]] = None,
+                metric_fields: Optional[List[str]] = None, info_state: bool = False,
+                batch: int = NDJSON_BATCH) -> Iterator[bytes]:
+    """build_page items as newline-delimited JSON, a batch of hospitals per chunk"""
+    for start in range(0, len(positions), batch):
+        items = build_page(labels, info_records, metric_records, positions[start:start + batch],
+                           info_fields, metric_fields, info_state)
+        yield b''.join(dumps(item) + b'\n' for item in items)
+
+
+def wants_ndjson(fmt: Optional[str], accept: Optional[str]) -> bool:
+    """?format=ndjson or an Accept header asking for NDJSON"""
+    if fmt:
+        return fmt.strip().lower() == 'ndjson'
+    return any(t in (accept or '') for t in ('application/x-ndjson', 'application/ndjson'))
@@ -0,0 +1,204 @@
+"""
+Peer-group benchmark cube.
+
+Every hospital is tagged with its state, region, Hospital Type, Hospital
+Ownership and Emergency Services. Metric means and counts are then computed
+for every combination of those dimensions present in the data, including
+partial combinations with the other dimensions left open. Comparisons such
+as "my state, same type" or "same ownership in my region" become dict
+lookups instead of DataFrame scans.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .lazy import lazy_import
+from .records import join_positions
+
+pd = lazy_import('pandas')
+
+REGIONS = {
+    'West': ['CA', 'OR', 'WA', 'NV', 'ID', 'MT', 'WY', 'UT', 'CO', 'AZ', 'NM', 'AK', 'HI'],
+    'Midwest': ['IL', 'IN', 'MI', 'OH', 'WI', 'MN', 'IA', 'MO', 'ND', 'SD', 'NE', 'KS'],
+    'South': ['TX', 'OK', 'AR', 'LA', 'MS', 'AL', 'GA', 'FL', 'SC', 'NC', 'TN', 'KY', 'WV', 'VA', 'MD', 'DE'],
+    'Northeast': ['NY', 'PA', 'NJ', 'CT', 'RI', 'MA', 'VT', 'NH', 'ME']
+}
+
+STATE_REGIONS = {state: region for region, states in REGIONS.items() for state in states}
+
+# Dimension name -> Hospital_General_Information.csv column (state and region come from the pivot)
+PEER_DIMENSIONS = {
+    'state': None,
+    'region': None,
+    'type': 'Hospital Type',
+    'ownership': 'Hospital Ownership',
+    'emergency': 'Emergency Services',
+}
+
+
+def region_for_state(state) -> str:
+    """Census-style region of a state ('Other' for territories and unknowns)"""
+    return STATE_REGIONS.get(state, 'Other')
+
+
+@dataclass(frozen=True)
+class PeerCube:
+    """Means and counts per metric for every peer group present in the data"""
+    metrics: tuple
+    dimensions: tuple
+    cells: Dict[Tuple, int]
+    means: np.ndarray
+    counts: np.ndarray
+    hospital_groups: Tuple[Dict[str, str], ...]
+    dimension_codes: Dict[str, Tuple[np.ndarray, list]]
+
+    def key(self, group: Dict[str, Optional[str]]) -> Tuple:
+        return _cell_key(group, self.dimensions)
+
+    def lookup(self, **group) -> Optional[dict]:
+        """{metric: {"mean", "count"}} for a peer group, None when no hospital is in it"""
+        unknown = set(group) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f"Unknown peer dimension: {', '.join(sorted(unknown))}")
+        row = self.cells.get(self.key({dim: value for dim, value in group.items() if value is not None}))
+        if row is None:
+            return None
+        return {
+            metric: {
+                "mean": float(self.means[row, j]) if self.counts[row, j] else None,
+                "count": int(self.counts[row, j]),
+            }
+            for j, metric in enumerate(self.metrics)
+        }
+
+    def group_mask(self, group: Dict[str, str]) -> np.ndarray:
+        """Pivot rows belonging to a peer group"""
+        mask = np.ones(len(self.hospital_groups), dtype=bool)
+        for dim, value in group.items():
+            if dim not in self.dimension_codes:
+                raise ValueError(f"Unknown peer dimension: {dim}")
+            codes, labels = self.dimension_codes[dim]
+            wanted = str(value).strip().casefold()
+            matches = [i for i, label in enumerate(labels) if label.casefold() == wanted]
+            mask &= np.isin(codes, matches)
+        return mask
+
+    def peer_group(self, position: int, by: Sequence[str]) -> Dict[str, str]:
+        """The values of the given dimensions for a pivot row"""
+        unknown = set(by) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f"Unknown peer dimension: {', '.join(sorted(unknown))}")
+        groups = self.hospital_groups[position]
+        return {dim: groups[dim] for dim in self.dimensions if dim in by and dim in groups}
+
+
+def _cell_key(group: Dict[str, Optional[str]], dimensions: Sequence[str]) -> Tuple:
+    """Case-insensitive cube key; None leaves a dimension open"""
+    return tuple(str(group[dim]).strip().casefold() if group.get(dim) is not None else None for dim in dimensions)
+
+
+def _dimension_codes(pivot: pd.DataFrame, hospitals: pd.DataFrame) -> Dict[str, Tuple[np.ndarray, list]]:
+    states = pivot['State']
+    positions = join_positions(pivot, hospitals)
+    matched = positions >= 0
+    columns = {
+        'state': states.to_numpy(dtype=object),
+        'region': np.array([region_for_state(s) for s in states.tolist()], dtype=object),
+    }
+    for dim, column in PEER_DIMENSIONS.items():
+        if column is None:
+            continue
+        values = np.full(len(pivot), None, dtype=object)
+        if column in hospitals.columns:
+            values[matched] = hospitals[column].iloc[positions[matched]].to_numpy(dtype=object)
+        columns[dim] = values
+    codes = {}
+    for dim, values in columns.items():
+        # Blank and missing values leave a hospital out of groups on that dimension
+        labels = [str(v).strip() if pd.notna(v) and str(v).strip() else None for v in values.tolist()]
+        dim_codes, uniques = pd.factorize(pd.Series(labels, dtype=object))
+        codes[dim] = (dim_codes, list(uniques))
+    return codes
+
+
+def build_peer_cube(pivot: pd.DataFrame, hospitals: pd.DataFrame, metrics: Sequence[str]) -> PeerCube:
+    """Group sums and counts for every subset of the peer dimensions"""
+    metrics = tuple(metrics)
+    dimensions = tuple(PEER_DIMENSIONS)
+    values = pivot[list(metrics)].to_numpy(dtype=float)
+    finite = np.isfinite(values)
+    clean = np.where(finite, values, 0.0)
+    n_metrics = len(metrics)
+    codes = _dimension_codes(pivot, hospitals)
+
+    cells: Dict[Tuple, int] = {}
+    means, counts = [], []
+    for size in range(len(dimensions) + 1):
+        for dims in combinations(dimensions, size):
+            valid = np.ones(len(pivot), dtype=bool)
+            key = np.zeros(len(pivot), dtype=np.int64)
+            for dim in dims:
+                dim_codes, uniques = codes[dim]
+                valid &= dim_codes >= 0
+                key = key * (len(uniques) + 1) + dim_codes
+            cell_keys, inverse = np.unique(key[valid], return_inverse=True)
+            n_cells = len(cell_keys)
+            flat = (inverse[:, None] * n_metrics + np.arange(n_metrics)).ravel()
+            sums = np.bincount(flat, weights=clean[valid].ravel(), minlength=n_cells * n_metrics)
+            group_counts = np.bincount(flat, weights=finite[valid].ravel(), minlength=n_cells * n_metrics)
+            sums = sums.reshape(n_cells, n_metrics)
+            group_counts = group_counts.reshape(n_cells, n_metrics).astype(np.int64)
+
+            # One representative row per cell gives its dimension values
+            first = np.flatnonzero(valid)[np.unique(inverse, return_index=True)[1]]
+            for cell, row in enumerate(first.tolist()):
+                group = {dim: codes[dim][1][codes[dim][0][row]] for dim in dims}
+                cells[_cell_key(group, dimensions)] = len(means) + cell
+            means.extend(np.divide(sums, group_counts, out=np.full(sums.shape, np.nan), where=group_counts > 0))
+            counts.extend(group_counts)
+
+    hospital_groups = tuple(
+        {dim: codes[dim][1][codes[dim][0][row]] for dim in dimensions if codes[dim][0][row] >= 0}
+        for row in range(len(pivot))
+    )
+    return PeerCube(
+        metrics=metrics,
+        dimensions=dimensions,
+        cells=cells,
+        means=np.array(means).reshape(-1, n_metrics),
+        counts=np.array(counts, dtype=np.int64).reshape(-1, n_metrics),
+        hospital_groups=hospital_groups,
+        dimension_codes=codes,
+    )
+
+
+def peer_filters(params: Mapping[str, Optional[str]]) -> Dict[str, str]:
+    """Dimension -> value for every peer dimension given in params (query parameters)"""
+    return {dim: params[dim] for dim in PEER_DIMENSIONS if params.get(dim) is not None}
+
+
+def parse_peer_dimensions(by: Optional[str]) -> Tuple[str, ...]:
+    """Dimensions from a comma-separated by= list"""
+    dims = tuple(d.strip().lower() for d in (by or '').split(',') if d.strip())
+    unknown = [d for d in dims if d not in PEER_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown peer dimension: {', '.join(unknown)}")
+    return dims
+
+
+def compare_to_peers(peer_metrics: Dict[str, dict], hospital_metrics: Dict[str, dict]) -> Dict[str, dict]:
+    """Peer means with the hospital's value and its difference from the peer mean"""
+    compared = {}
+    for metric, peer in peer_metrics.items():
+        entry = dict(peer)
+        record = hospital_metrics.get(metric)
+        if record is not None:
+            entry["hospital"] = record["hospital"]
+            entry["vsPeers"] = round(record["hospital"] - peer["mean"], 1) if peer["mean"] is not None else None
+        compared[metric] = entry
+    return compared
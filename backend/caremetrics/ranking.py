@@ -0,0 +1,104 @@
+"""
+Leaderboard queries over the friendly metrics.
+
+Every metric's finite values are argsorted once per snapshot in both
+directions. An unfiltered top-N, with or without a value range, is then two
+binary searches and a slice. Queries restricted to a state or peer group
+select their candidate rows and use argpartition, so they cost one pass over
+the candidates rather than a full sort.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+DEFAULT_RANK_LIMIT = 25
+MAX_RANK_LIMIT = 500
+
+
+@dataclass(frozen=True)
+class RankIndex:
+    """Per-metric orderings of the pivot rows"""
+    metrics: tuple
+    values: np.ndarray
+    ascending: Dict[str, np.ndarray]
+    descending: Dict[str, np.ndarray]
+    sorted_values: Dict[str, np.ndarray]
+
+    def top(self, metric: str, limit: int, descending: bool = True, mask: Optional[np.ndarray] = None,
+            minimum: Optional[float] = None, maximum: Optional[float] = None,
+            offset: int = 0) -> Tuple[np.ndarray, int]:
+        """(pivot rows in rank order, number of rows matching) for one page of a leaderboard"""
+        if metric not in self.ascending:
+            raise ValueError(f"Unknown metric: {metric}")
+        sorted_values = self.sorted_values[metric]
+        lo = np.searchsorted(sorted_values, minimum, side='left') if minimum is not None else 0
+        hi = np.searchsorted(sorted_values, maximum, side='right') if maximum is not None else len(sorted_values)
+        hi = max(hi, lo)
+
+        if mask is None:
+            if descending:
+                n = len(sorted_values)
+                rows = self.descending[metric][n - hi:n - lo]
+            else:
+                rows = self.ascending[metric][lo:hi]
+            return rows[offset:offset + limit], len(rows)
+
+        column = self.values[:, self.metrics.index(metric)]
+        keep = mask & np.isfinite(column)
+        if minimum is not None:
+            keep &= column >= minimum
+        if maximum is not None:
+            keep &= column <= maximum
+        candidates = np.flatnonzero(keep)
+        # Sort key: value in the requested direction, then pivot row for stable ties
+        keys = -column[candidates] if descending else column[candidates]
+        wanted = offset + limit
+        if wanted < len(candidates):
+            nearest = np.argpartition(keys, wanted - 1)[:wanted]
+            # Rows tied with the cut-off value must compete on the tie-break too
+            cutoff = keys[nearest].max()
+            nearest = np.union1d(nearest, np.flatnonzero(keys == cutoff))
+        else:
+            nearest = np.arange(len(candidates))
+        order = nearest[np.lexsort((candidates[nearest], keys[nearest]))]
+        return candidates[order][offset:offset + limit], len(candidates)
+
+
+def build_rank_index(pivot: pd.DataFrame, metrics) -> RankIndex:
+    metrics = tuple(metrics)
+    values = pivot[list(metrics)].to_numpy(dtype=float)
+    ascending, descending, sorted_values = {}, {}, {}
+    for j, metric in enumerate(metrics):
+        finite = np.flatnonzero(np.isfinite(values[:, j]))
+        column = values[finite, j]
+        up = np.argsort(column, kind='stable')
+        ascending[metric] = finite[up]
+        descending[metric] = finite[np.argsort(-column, kind='stable')]
+        sorted_values[metric] = column[up]
+    return RankIndex(metrics=metrics, values=values, ascending=ascending,
+                     descending=descending, sorted_values=sorted_values)
+
+
+def parse_rank_query(limit, offset, order, minimum, maximum) -> Tuple[int, int, bool, Optional[float], Optional[float]]:
+    """Validated (limit, offset, descending, minimum, maximum) from query strings"""
+    try:
+        limit = int(limit) if limit not in (None, '') else DEFAULT_RANK_LIMIT
+        offset = int(offset) if offset not in (None, '') else 0
+        minimum = float(minimum) if minimum not in (None, '') else None
+        maximum = float(maximum) if maximum not in (None, '') else None
+    except (TypeError, ValueError):
+        raise ValueError("limit and offset must be integers, min and max numbers")
+    if limit < 1 or offset < 0:
+        raise ValueError("limit must be positive and offset not negative")
+    order = (order or 'desc').strip().lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be asc or desc")
+    return min(limit, MAX_RANK_LIMIT), offset, order == 'desc', minimum, maximum
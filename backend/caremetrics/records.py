@@ -0,0 +1,179 @@
+"""
+Column-wise builders for the per-hospital response records.
+
+Hospital info is joined to the aggregated pivot once by Facility ID and the
+metric comparisons are computed as whole-array operations, so building the
+all-hospitals payload never scans the hospitals frame per row.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .aggregation import DEFAULT_AVERAGE, AverageTable
+from .lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+
+def normalize_facility_id(value) -> str:
+    """CMS Facility IDs are 6 characters; restore zeros lost to int parsing"""
+    return str(value).strip().upper().zfill(6)
+
+
+def normalize_name(name) -> str:
+    """Case- and whitespace-insensitive form of a Facility Name"""
+    return ' '.join(str(name).split()).casefold()
+
+
+def facility_keys(ids: pd.Series) -> pd.Index:
+    """Normalized Facility IDs so both CSVs join on the same key"""
+    return pd.Index(ids.astype(str).str.strip().str.upper().str.zfill(6))
+
+
+@dataclass(frozen=True)
+class FacilityLabels:
+    """Facility ID (as text), name and state of every pivot row, as plain lists"""
+    ids: list
+    names: list
+    states: list
+
+
+def build_labels(pivot: pd.DataFrame) -> FacilityLabels:
+    return FacilityLabels(
+        ids=pivot['Facility ID'].astype(str).tolist(),
+        names=pivot['Facility Name'].tolist(),
+        states=pivot['State'].tolist(),
+    )
+
+
+def build_id_index(pivot: pd.DataFrame) -> Dict[str, int]:
+    """Normalized Facility ID -> pivot row"""
+    index: Dict[str, int] = {}
+    for position, key in enumerate(facility_keys(pivot['Facility ID'])):
+        index.setdefault(key, position)
+    return index
+
+
+def build_name_index(pivot: pd.DataFrame) -> Dict[str, tuple]:
+    """Normalized Facility Name -> pivot rows, in pivot order (names are not unique)"""
+    index: Dict[str, list] = {}
+    for position, name in enumerate(pivot['Facility Name'].tolist()):
+        if pd.notna(name):
+            index.setdefault(normalize_name(name), []).append(position)
+    return {name: tuple(positions) for name, positions in index.items()}
+
+
+def join_positions(pivot: pd.DataFrame, hospitals: pd.DataFrame) -> np.ndarray:
+    """Row in hospitals for every pivot row (-1 when there is no match)"""
+    keys = facility_keys(hospitals['Facility ID'])
+    # First row wins when a Facility ID is listed more than once
+    first = ~keys.duplicated()
+    unique_keys = keys[first]
+    rows = np.flatnonzero(first)
+    positions = unique_keys.get_indexer(facility_keys(pivot['Facility ID']))
+    if not len(rows):
+        return np.full(len(positions), -1, dtype=np.int64)
+    return np.where(positions >= 0, rows[positions], -1)
+
+
+def clean_column(column: pd.Series) -> list:
+    """JSON-safe Python values: missing/non-finite -> '', numbers kept, rest str"""
+    if pd.api.types.is_bool_dtype(column) or pd.api.types.is_integer_dtype(column):
+        return column.tolist()
+    if pd.api.types.is_float_dtype(column):
+        values = column.to_numpy(dtype=float)
+        finite = np.isfinite(values)
+        return [v if ok else '' for v, ok in zip(values.tolist(), finite.tolist())]
+    values = column.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    return ['' if m else (v if isinstance(v, (int, float)) else str(v)) for v, m in zip(values.tolist(), missing.tolist())]
+
+
+def clean_info_column(hospitals: pd.DataFrame, col: str) -> list:
+    """clean_column of a hospital info column, with Facility ID typed as the info responses have it
+
+    The schema reads Facility ID as text to keep its leading zeros for the
+    join, but read_csv used to infer it, so info["Facility ID"] is an int
+    (10001, not "010001") whenever every ID is numeric.
+    """
+    column = hospitals[col]
+    if col == 'Facility ID' and not pd.api.types.is_numeric_dtype(column):
+        numeric = pd.to_numeric(column, errors='coerce')
+        if len(numeric) and numeric.notna().all() and (numeric % 1 == 0).all():
+            column = numeric.astype('int64')
+    return clean_column(column)
+
+
+def build_info_records(pivot: pd.DataFrame, hospitals: pd.DataFrame) -> List[dict]:
+    """Cleaned hospital info dict for every pivot row ({} when unmatched)"""
+    positions = join_positions(pivot, hospitals)
+    matched = positions >= 0
+    joined = hospitals.iloc[positions[matched]]
+
+    columns = list(joined.columns)
+    values = zip(*[clean_info_column(joined, col) for col in columns]) if columns else iter(())
+    matched_records = [dict(zip(columns, row)) for row in values]
+
+    records: List[dict] = [{} for _ in range(len(pivot))]
+    for i, record in zip(np.flatnonzero(matched).tolist(), matched_records):
+        records[i] = record
+    return records
+
+
+def round_like_python(values: np.ndarray, digits: int = 1) -> np.ndarray:
+    """np.round, with near-ties re-rounded by round() so results match per-value code"""
+    rounded = np.round(values, digits)
+    scaled = np.abs(values) * 10 ** digits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for idx in zip(*np.nonzero(near_tie)):
+        rounded[idx] = round(float(values[idx]), digits)
+    return rounded
+
+
+def build_metric_records(pivot: pd.DataFrame, averages: AverageTable,
+                         metrics: Sequence[str] = None) -> List[Dict[str, dict]]:
+    """hospital/state/national/vsState/vsNational for every pivot row"""
+    metrics = list(metrics or averages.metrics)
+    columns = [averages.metrics.index(m) for m in metrics]
+    values = pivot[metrics].to_numpy(dtype=float)
+    finite = np.isfinite(values)
+
+    state_rows = np.array([averages.state_index.get(s, -1) for s in pivot['State'].tolist()], dtype=np.int64)
+    state_avgs = averages.state_means[:, columns][state_rows]
+    # Hospitals whose state has no table row fall back to the default average
+    state_avgs[state_rows < 0] = DEFAULT_AVERAGE
+    national_avgs = np.broadcast_to(averages.national_means[columns], values.shape)
+
+    vs_state = round_like_python(values - state_avgs)
+    vs_national = round_like_python(values - national_avgs)
+
+    rows = zip(values.tolist(), state_avgs.tolist(), vs_state.tolist(), vs_national.tolist(), finite.tolist())
+    national = national_avgs[0].tolist() if len(values) else []
+    return [
+        {
+            metric: {
+                "hospital": v[j],
+                "state": s[j],
+                "national": national[j],
+                "vsState": vs[j],
+                "vsNational": vn[j],
+            }
+            for j, metric in enumerate(metrics) if ok[j]
+        }
+        for v, s, vs, vn, ok in rows
+    ]
+
+
+def build_all_hospitals(labels: FacilityLabels, info_records: Sequence[dict], metric_records: Sequence[dict],
+                        info_state: bool = False) -> Dict[str, dict]:
+    """{name: {"info", "metrics"}} for every hospital in the pivot"""
+    if info_state:
+        info_records = [{**info, 'state': state} for info, state in zip(info_records, labels.states)]
+    return {
+        name: {"info": info, "metrics": metrics}
+        for name, info, metrics in zip(labels.names, info_records, metric_records)
+    }
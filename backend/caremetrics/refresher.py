@@ -0,0 +1,154 @@
+"""
+Stale-while-revalidate refresh of the CMS source data.
+
+A daemon thread polls the source objects with conditional HEAD requests
+(If-None-Match / If-Modified-Since) over one pooled requests.Session, so an
+unchanged object costs a 304 on a kept-alive connection. Only when an ETag
+changes does it call reload(), still on its own thread: the caller rebuilds
+its data there and swaps it in at once, while requests keep being answered
+from the current version. A failed poll or reload is logged and retried on
+the next interval.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .lazy import lazy_import
+
+# Only needed once polling starts, on the refresher thread
+requests = lazy_import('requests')
+
+logger = logging.getLogger(__name__)
+
+# Seconds between polls; 0 turns the background refresh off
+REFRESH_INTERVAL = float(os.getenv('CAREMETRICS_REFRESH_SECONDS', 900))
+
+POLL_TIMEOUT = 10
+
+
+def _same_version(known: dict, current: dict) -> bool:
+    if known.get('etag') and current.get('etag'):
+        return known['etag'] == current['etag']
+    return known.get('last_modified') == current.get('last_modified')
+
+
+class SourceRefresher:
+    """Polls urls every interval and calls reload() when one of them has changed"""
+
+    def __init__(self, urls: Iterable[str], reload: Callable[[], None], interval: float = REFRESH_INTERVAL,
+                 session: Optional[requests.Session] = None):
+        self.urls = tuple(urls)
+        self.interval = interval
+        self._reload = reload
+        self._session = session
+        # url -> {"etag", "last_modified"} of the version being served
+        self._validators: Dict[str, dict] = {}
+        # One poll at a time; held through the reload
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._checks = 0
+        self._refreshes = 0
+        self._checked_at = None
+        self._refreshed_at = None
+        self._error = None
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            # The downloads' pooled session, so polls and reloads reuse the same connections
+            from .ingest import http_session
+            self._session = http_session()
+        return self._session
+
+    def _head(self, url: str) -> Tuple[bool, Optional[dict]]:
+        """(changed, validators) of url; the first sighting of a url is not a change"""
+        known = self._validators.get(url)
+        headers = {}
+        if known and known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known and known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+        resp = self.session.head(url, headers=headers, timeout=POLL_TIMEOUT, allow_redirects=True)
+        if resp.status_code == 304:
+            return False, known
+        resp.raise_for_status()
+        current = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+        return known is not None and not _same_version(known, current), current
+
+    def prime(self, etags: Optional[Dict[str, Optional[str]]] = None):
+        """Take the sources' current versions as those of the data being loaded
+
+        etags (url -> ETag recorded when the data was built) saves the
+        requests; without them each source is asked now. Call it before
+        downloading, so a change made during the download is still seen.
+        """
+        with self._lock:
+            if etags is not None:
+                self._validators.update({url: {'etag': '"%s"' % tag.strip('"'), 'last_modified': None}
+                                         for url, tag in etags.items() if tag and url in self.urls})
+                return
+            try:
+                for url in self.urls:
+                    self._validators.pop(url, None)
+                    self._validators[url] = self._head(url)[1]
+            except requests.RequestException as e:
+                logger.warning(f"Could not read source versions ({e}); the next poll records them")
+
+    def check(self) -> bool:
+        """Poll every source once and reload if any changed; returns whether it reloaded"""
+        with self._lock:
+            self._checks += 1
+            self._checked_at = time.time()
+            try:
+                polled = {url: self._head(url) for url in self.urls}
+                changed = [url for url, (is_changed, _) in polled.items() if is_changed]
+                if changed:
+                    logger.info(f"Source data changed ({', '.join(changed)}); refreshing in the background")
+                    started = time.monotonic()
+                    self._reload()
+                    self._refreshes += 1
+                    self._refreshed_at = time.time()
+                    logger.info(f"Refreshed source data in {time.monotonic() - started:.1f}s")
+                # Validators only advance once the reload succeeded, so a failed one is retried
+                self._validators.update({url: validators for url, (_, validators) in polled.items() if validators})
+                self._error = None
+                return bool(changed)
+            except Exception as e:
+                self._error = str(e)
+                logger.warning(f"Source refresh failed, still serving the current data: {e}")
+                return False
+
+    def start(self):
+        """Poll on a daemon thread (once per process; not when interval is 0)"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='source-refresher', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def status(self) -> dict:
+        return {
+            'interval': self.interval,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'checks': self._checks,
+            'refreshes': self._refreshes,
+            'checked_at': self._checked_at,
+            'refreshed_at': self._refreshed_at,
+            'error': self._error,
+            'etags': {url: (v or {}).get('etag') for url, v in self._validators.items()},
+        }
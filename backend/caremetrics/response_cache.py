@@ -0,0 +1,131 @@
+"""
+Pre-serialized, precompressed response bodies for the heavy endpoints.
+
+Each entry stores the encoded JSON bytes for one data version together with
+gzip and (when the brotli package is installed) brotli variants and a strong
+ETag, so repeat requests only pick a variant and copy bytes.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional speedup
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 7
+
+
+def _json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON bytes; uses orjson when available and understands NumPy values"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default, separators=(',', ':')).encode()
+
+
+@dataclass(frozen=True)
+class EncodedResponse:
+    """One JSON body with its precompressed variants"""
+    version: object
+    etag: str
+    identity: bytes
+    gzip: bytes
+    br: Optional[bytes]
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Pick the smallest variant the client accepts: (body, Content-Encoding)"""
+        accepted = _parse_accept_encoding(accept_encoding)
+        if self.br is not None and _accepts(accepted, 'br'):
+            return self.br, 'br'
+        if _accepts(accepted, 'gzip'):
+            return self.gzip, 'gzip'
+        return self.identity, None
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or self.etag in tags
+
+
+def _parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    accepted = {}
+    for part in (header or '').split(','):
+        if not part.strip():
+            continue
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def _accepts(accepted: Dict[str, float], coding: str) -> bool:
+    return accepted.get(coding, accepted.get('*', 0.0)) > 0
+
+
+def encode_response(obj, version) -> EncodedResponse:
+    """Serialize once and precompress every supported encoding"""
+    body = dumps(obj)
+    digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+    return EncodedResponse(
+        version=version,
+        etag=f'"{version}-{digest}"',
+        identity=body,
+        gzip=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        br=brotli.compress(body, quality=BROTLI_QUALITY) if brotli is not None else None,
+    )
+
+
+class ResponseCache:
+    """Encoded responses keyed by name, rebuilt when the data version changes"""
+
+    def __init__(self):
+        self._entries: Dict[str, EncodedResponse] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version, build: Callable[[], object]) -> EncodedResponse:
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            return entry
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                entry = encode_response(build(), version)
+                self._entries[key] = entry
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
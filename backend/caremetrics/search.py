@@ -0,0 +1,157 @@
+"""
+Typeahead search over hospital names.
+
+Names are normalized (case- and whitespace-insensitive) once per snapshot
+and indexed three ways:
+- a sorted name list for whole-name prefixes;
+- a sorted word list (names split on non-alphanumerics) for word prefixes;
+- a trigram posting list for substring and fuzzy matches.
+
+A keystroke lookup is a few bisects plus bincounts over the postings of the
+query's trigrams. A fuzzy match is scored by the share of the query's
+trigrams found in the name, so a short, misspelt query still matches a long
+name. Results rank exact, then prefix, then word-prefix, then substring,
+then fuzzy matches.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .lazy import lazy_import
+from .records import clean_column, join_positions, normalize_name
+
+pd = lazy_import('pandas')
+
+DEFAULT_RESULTS = 10
+MAX_RESULTS = 50
+
+# Share of the query's trigrams a name must contain to be a fuzzy match
+FUZZY_THRESHOLD = 0.5
+
+WORD_SEPARATORS = re.compile(r'\W+')
+
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY, NO_MATCH = range(6)
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def name_words(name: str) -> set:
+    """Words of a normalized name ("cedars-sinai" -> cedars, sinai)"""
+    return {word for word in WORD_SEPARATORS.split(name) if word}
+
+
+def _sorted_with_rows(pairs: List[Tuple[str, int]]) -> Tuple[tuple, np.ndarray]:
+    pairs.sort()
+    return tuple(p[0] for p in pairs), np.array([p[1] for p in pairs], dtype=np.int64)
+
+
+def _prefix_rows(keys: tuple, rows: np.ndarray, prefix: str) -> np.ndarray:
+    start = bisect_left(keys, prefix)
+    end = bisect_left(keys, prefix + '\uffff', lo=start)
+    return rows[start:end]
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """Name, word and trigram indexes over the pivot rows"""
+    names: tuple
+    name_lengths: np.ndarray
+    results: tuple
+    name_keys: tuple
+    name_rows: np.ndarray
+    word_keys: tuple
+    word_rows: np.ndarray
+    grams: Dict[str, np.ndarray]
+
+    def _shared(self, query_grams: set, n: int) -> np.ndarray:
+        """Number of query_grams in each name"""
+        postings = [self.grams[g] for g in query_grams if g in self.grams]
+        return np.bincount(np.concatenate(postings), minlength=n) if postings else np.zeros(n, dtype=np.int64)
+
+    def search(self, query: str, limit: int = DEFAULT_RESULTS) -> List[dict]:
+        """Best matches for a partial name, best first"""
+        q = normalize_name(query)
+        n = len(self.names)
+        if not q or n == 0:
+            return []
+        tier = np.full(n, NO_MATCH, dtype=np.int8)
+        similarity = np.zeros(n)
+
+        # Fuzzy: the leading space favours names with a word starting like the query
+        query_grams = trigrams(f" {q}")
+        if query_grams:
+            similarity = self._shared(query_grams, n) / len(query_grams)
+            tier[similarity >= FUZZY_THRESHOLD] = FUZZY
+        word_rows = _prefix_rows(self.word_keys, self.word_rows, q)
+        tier[word_rows] = WORD_PREFIX
+        tier[_prefix_rows(self.name_keys, self.name_rows, q)] = PREFIX
+        start = bisect_left(self.name_keys, q)
+        tier[self.name_rows[start:bisect_right(self.name_keys, q, lo=start)]] = EXACT
+        # Substring anywhere in the name: every trigram of the bare query present, then confirmed
+        substring_grams = trigrams(q)
+        if substring_grams:
+            shared = self._shared(substring_grams, n)
+            for row in np.flatnonzero((shared == len(substring_grams)) & (tier > WORD_PREFIX)).tolist():
+                if q in self.names[row]:
+                    tier[row] = SUBSTRING
+
+        candidates = np.flatnonzero(tier < NO_MATCH)
+        order = np.lexsort((candidates, self.name_lengths[candidates], -similarity[candidates], tier[candidates]))
+        return [self.results[r] for r in candidates[order[:limit]].tolist()]
+
+
+def build_search_index(pivot: pd.DataFrame, hospitals: pd.DataFrame) -> SearchIndex:
+    names = [normalize_name(name) if pd.notna(name) else '' for name in pivot['Facility Name'].tolist()]
+
+    positions = join_positions(pivot, hospitals)
+    cities = [''] * len(pivot)
+    if 'City/Town' in hospitals.columns:
+        matched = np.flatnonzero(positions >= 0)
+        joined = clean_column(hospitals['City/Town'].iloc[positions[matched]])
+        for row, city in zip(matched.tolist(), joined):
+            cities[row] = city
+    results = tuple(
+        {"facilityId": str(fid), "name": name, "city": city, "state": state}
+        for fid, name, city, state in zip(pivot['Facility ID'].tolist(), pivot['Facility Name'].tolist(),
+                                          cities, pivot['State'].tolist())
+    )
+
+    grams: Dict[str, list] = {}
+    word_pairs = []
+    for row, name in enumerate(names):
+        for gram in trigrams(f" {name} "):
+            grams.setdefault(gram, []).append(row)
+        word_pairs.extend((word, row) for word in name_words(name))
+
+    name_keys, name_rows = _sorted_with_rows([(name, row) for row, name in enumerate(names) if name])
+    word_keys, word_rows = _sorted_with_rows(word_pairs)
+    return SearchIndex(
+        names=tuple(names),
+        name_lengths=np.array([len(name) for name in names], dtype=np.int64),
+        results=results,
+        name_keys=name_keys,
+        name_rows=name_rows,
+        word_keys=word_keys,
+        word_rows=word_rows,
+        grams={gram: np.array(rows, dtype=np.int64) for gram, rows in grams.items()},
+    )
+
+
+def parse_result_limit(limit, default: int = DEFAULT_RESULTS) -> int:
+    if limit is None or limit == '':
+        return default
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_RESULTS)
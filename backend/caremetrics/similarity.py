@@ -0,0 +1,68 @@
+"""
+Nearest-neighbour search over the facility x friendly-metric matrix.
+
+The metric matrix is built once per snapshot. Every query is a vectorized
+distance scan of the candidate rows (all of them, or a state or peer group)
+plus argpartition. A few thousand hospitals with eight metrics scan in well
+under a millisecond, so no spatial index is kept.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+DEFAULT_NEIGHBOURS = 10
+MAX_NEIGHBOURS = 100
+
+
+@dataclass(frozen=True)
+class SimilarityIndex:
+    """Metric vectors of every pivot row"""
+    metrics: tuple
+    vectors: np.ndarray
+
+    def nearest(self, position: int, k: int = DEFAULT_NEIGHBOURS,
+                mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """(pivot row, Euclidean distance) of the k rows closest to position, excluding itself"""
+        point = self.vectors[position]
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(self.vectors))
+        candidates = candidates[candidates != position]
+        if len(candidates) == 0:
+            return []
+        squared = ((self.vectors[candidates] - point) ** 2).sum(axis=1)
+        if k < len(candidates):
+            nearest = np.argpartition(squared, k)[:k]
+        else:
+            nearest = np.arange(len(candidates))
+        nearest = nearest[np.argsort(squared[nearest], kind='stable')]
+        return list(zip(candidates[nearest].tolist(), np.sqrt(squared[nearest]).tolist()))
+
+
+def build_similarity_index(pivot: pd.DataFrame, metrics) -> SimilarityIndex:
+    metrics = tuple(metrics)
+    vectors = pivot[list(metrics)].to_numpy(dtype=float)
+    # Missing values sit at the metric mean so they neither attract nor repel neighbours
+    missing = ~np.isfinite(vectors)
+    if missing.any():
+        means = np.nanmean(np.where(missing, np.nan, vectors), axis=0)
+        vectors = np.where(missing, np.nan_to_num(means)[None, :], vectors)
+    return SimilarityIndex(metrics=metrics, vectors=vectors)
+
+
+def parse_neighbours(k, default: int = DEFAULT_NEIGHBOURS) -> int:
+    if k is None or k == '':
+        return default
+    try:
+        k = int(k)
+    except (TypeError, ValueError):
+        raise ValueError("k must be an integer")
+    if k < 1:
+        raise ValueError("k must be positive")
+    return min(k, MAX_NEIGHBOURS)
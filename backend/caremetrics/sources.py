@@ -0,0 +1,21 @@
+"""
+The CMS source files and the HCAHPS measures benchmarked from them.
+"""
+
+# S3 URLs for the CSVs
+HCAHPS_URL = 'https://hospital-benchmark-data.s3.us-east-1.amazonaws.com/HCAHPS.csv'
+HOSPITAL_URL = 'https://hospital-benchmark-data.s3.us-east-1.amazonaws.com/Hospital_General_Information.csv'
+
+# Metrics to benchmark (updated to match actual CSV data)
+METRIC_IDS = {
+    'H_COMP_1_A_P': 'Nurse Communication',
+    'H_COMP_2_A_P': 'Doctor Communication',
+    'H_COMP_3_A_P': 'Staff Responsiveness',
+    'H_CALL_BUTTON_A_P': 'Staff Responsiveness',
+    'H_BATH_HELP_A_P': 'Staff Responsiveness',
+    'H_SIDE_EFFECTS_A_P': 'Care Transition',
+    'H_DISCH_HELP_Y_P': 'Discharge Info',
+    'H_CLEAN_HSP_A_P': 'Care Cleanliness',
+    'H_QUIET_HSP_A_P': 'Quietness',
+    'H_RECMND_DY': 'Recommend'
+}
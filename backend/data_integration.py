@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 import json
 import os
 from dotenv import load_dotenv
+from caremetrics.peers import region_for_state
 
 load_dotenv()
 
@@ -145,18 +146,7 @@ class HCAHPSDataIntegration:
     
     def _get_region(self, state):
         """Map state to region"""
-        regions = {
-            'West': ['CA', 'OR', 'WA', 'NV', 'ID', 'MT', 'WY', 'UT', 'CO', 'AZ', 'NM', 'AK', 'HI'],
-            'Midwest': ['IL', 'IN', 'MI', 'OH', 'WI', 'MN', 'IA', 'MO', 'ND', 'SD', 'NE', 'KS'],
-            'South': ['TX', 'OK', 'AR', 'LA', 'MS', 'AL', 'GA', 'FL', 'SC', 'NC', 'TN', 'KY', 'WV', 'VA', 'MD', 'DE'],
-            'Northeast': ['NY', 'PA', 'NJ', 'CT', 'RI', 'MA', 'VT', 'NH', 'ME']
-        }
-        
-        for region, states in regions.items():
-            if state in states:
-                return region
-        
-        return 'Other'
+        return region_for_state(state)
     
     def _calculate_state_averages(self, hcahps_data):
         """Calculate state averages for HCAHPS metrics"""
@@ -0,0 +1,126 @@
+"""
+Single-flight loader for the CMS source data.
+
+Sync FastAPI endpoints run in a threadpool, so a burst of requests against a
+cold process would otherwise each start their own download and parse. The
+loader lets exactly one caller run the load while every concurrent caller
+waits for its result; a failed load is remembered only for a short cooldown
+so the next request after it retries.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+IDLE = 'idle'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class DataUnavailable(RuntimeError):
+    """The source data could not be loaded (see __cause__ for the original error)"""
+
+    def __init__(self, message: str, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SingleFlightLoader:
+    """Runs load() once across threads; callers block until it finishes"""
+
+    def __init__(self, load: Callable[[], None], retry_after: float = 5.0):
+        self._load = load
+        self._retry_after = retry_after
+        self._cond = threading.Condition()
+        self._state = IDLE
+        self._flight = 0
+        self._error: Optional[BaseException] = None
+        self._failed_at = 0.0
+        self._started_at = None
+        self._loaded_at = None
+        self._duration = None
+        self._attempts = 0
+        self._waiters = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._state == READY
+
+    def ensure_loaded(self):
+        """Return once the data is loaded, loading it if no other thread is"""
+        if self._state == READY:
+            return
+        with self._cond:
+            while True:
+                if self._state == READY:
+                    return
+                if self._state == LOADING:
+                    flight = self._flight
+                    self._waiters += 1
+                    try:
+                        while self._state == LOADING and self._flight == flight:
+                            self._cond.wait()
+                    finally:
+                        self._waiters -= 1
+                    if self._state == FAILED and self._flight == flight:
+                        # Share the leader's failure rather than immediately retrying
+                        self._raise_failure()
+                    continue
+                if self._state == FAILED and time.monotonic() - self._failed_at < self._retry_after:
+                    self._raise_failure()
+                self._state = LOADING
+                self._flight += 1
+                self._attempts += 1
+                self._started_at = time.time()
+                break
+
+        started = time.monotonic()
+        # Anything but an Exception (KeyboardInterrupt, SystemExit, a worker timeout) is not a
+        # data failure: the loader goes back to IDLE so the next caller loads again
+        state, error = IDLE, None
+        try:
+            self._load()
+            state = READY
+        except Exception as e:
+            state, error = FAILED, e
+            logger.error(f"Data load failed after {time.monotonic() - started:.1f}s: {e}")
+            raise DataUnavailable(f"Data load failed: {e}", self._retry_after) from e
+        finally:
+            # Never leave the loader LOADING, or every later caller would wait on it forever
+            with self._cond:
+                self._state = state
+                self._error = error
+                if state == FAILED:
+                    self._failed_at = time.monotonic()
+                elif state == READY:
+                    self._loaded_at = time.time()
+                    self._duration = time.monotonic() - started
+                self._cond.notify_all()
+        logger.info(f"Data loaded in {self._duration:.1f}s")
+
+    def _raise_failure(self):
+        remaining = max(0.0, self._retry_after - (time.monotonic() - self._failed_at))
+        raise DataUnavailable(f"Data load failed: {self._error}", remaining) from self._error
+
+    def reset(self):
+        """Forget a completed load so the next caller loads again"""
+        with self._cond:
+            if self._state != LOADING:
+                self._state = IDLE
+                self._error = None
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                'state': self._state,
+                'attempts': self._attempts,
+                'waiting': self._waiters,
+                'started_at': self._started_at,
+                'loaded_at': self._loaded_at,
+                'load_seconds': round(self._duration, 3) if self._duration is not None else None,
+                'error': str(self._error) if self._error is not None else None,
+            }
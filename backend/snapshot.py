@@ -0,0 +1,122 @@
+"""
+Immutable benchmark snapshot for HealthMetrics Pro.
+
+The HCAHPS aggregation and the averages derived from it only change when new
+source data is loaded, so they are computed once per data version and shared
+by every endpoint instead of being rebuilt on each request.
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from caremetrics.aggregation import AverageTable, build_average_table
+from caremetrics.composite import CompositeModel, build_composite_model
+from caremetrics.distribution import MetricDistribution, build_distributions, percentile_fields_batch
+from caremetrics.paging import PageIndex, build_page_index
+from caremetrics.peers import PeerCube, build_peer_cube
+from caremetrics.ranking import RankIndex, build_rank_index
+from caremetrics.records import (FacilityLabels, build_id_index, build_info_records, build_labels,
+                                 build_metric_records, build_name_index, normalize_facility_id, normalize_name)
+from caremetrics.search import SearchIndex, build_search_index
+from caremetrics.similarity import SimilarityIndex, build_similarity_index
+
+
+@dataclass(frozen=True)
+class BenchmarkSnapshot:
+    """Aggregated HCAHPS data and benchmarks for one data version"""
+    version: int
+    pivot: pd.DataFrame
+    hospitals: pd.DataFrame
+    metrics: tuple
+    hospital_names: tuple
+    labels: FacilityLabels
+    averages: AverageTable
+    info_records: tuple
+    metric_records: tuple
+    id_index: Dict[str, int]
+    name_index: Dict[str, tuple]
+    page_index: PageIndex
+    distributions: Dict[str, MetricDistribution]
+    peers: PeerCube
+    similarity: SimilarityIndex
+    search: SearchIndex
+    ranking: RankIndex
+    composite: CompositeModel
+
+    def position_by_id(self, facility_id) -> Optional[int]:
+        """Pivot row for a Facility ID"""
+        return self.id_index.get(normalize_facility_id(facility_id))
+
+    def position_by_name(self, name) -> Optional[int]:
+        """Pivot row for a Facility Name (the first one when names repeat)"""
+        positions = self.name_index.get(normalize_name(name))
+        return positions[0] if positions else None
+
+    def hospital_record(self, position: int) -> dict:
+        """info and metrics for a pivot row, with national and in-state percentile ranks"""
+        return self.hospital_records([position])[0]
+
+    def hospital_records(self, positions: Sequence[int]) -> List[dict]:
+        """hospital_record for many pivot rows, ranking each metric in one pass"""
+        states = [self.labels.states[p] for p in positions]
+        metrics = percentile_fields_batch(self.distributions, [self.metric_records[p] for p in positions], states)
+        return [{"info": self.info_records[p], "metrics": m} for p, m in zip(positions, metrics)]
+
+    def memory_report(self) -> Dict[str, int]:
+        """Approximate bytes held per table (records are shallow estimates)"""
+        averages = self.averages
+        return {
+            'pivot': int(self.pivot.memory_usage(deep=True).sum()),
+            'hospitals': int(self.hospitals.memory_usage(deep=True).sum()),
+            'averages': sum(a.nbytes for a in (averages.national_means, averages.national_counts,
+                                               averages.state_means, averages.state_counts)),
+            'distributions': sum(d.national.nbytes + sum(v.nbytes for v in d.by_state.values())
+                                 for d in self.distributions.values()),
+            'peers': self.peers.means.nbytes + self.peers.counts.nbytes + sys.getsizeof(self.peers.cells),
+            'similarity': self.similarity.vectors.nbytes,
+            'ranking': sum(a.nbytes for orderings in (self.ranking.ascending, self.ranking.descending,
+                                                      self.ranking.sorted_values) for a in orderings.values()),
+            'composite': self.composite.finite.nbytes + self.composite.state_codes.nbytes,
+            'info_records': _records_size(self.info_records),
+            'metric_records': sum(_records_size(r.values()) + sys.getsizeof(r) for r in self.metric_records),
+            'indexes': (sys.getsizeof(self.id_index) + sys.getsizeof(self.name_index)
+                        + sys.getsizeof(self.page_index.keys) + self.page_index.positions.nbytes),
+        }
+
+
+def _records_size(records) -> int:
+    return sum(sys.getsizeof(r) for r in records)
+
+
+def build_snapshot(version: int, pivot: pd.DataFrame, hospitals: pd.DataFrame,
+                   metrics: Sequence[str]) -> BenchmarkSnapshot:
+    """Derive the benchmarks, per-hospital records and lookup indexes for a pivot"""
+    metrics = tuple(m for m in metrics if m in pivot.columns)
+
+    hospital_names: List[str] = pivot['Facility Name'].dropna().unique().tolist()
+    averages = build_average_table(pivot, metrics)
+    ranking = build_rank_index(pivot, metrics)
+
+    return BenchmarkSnapshot(
+        version=version,
+        pivot=pivot,
+        hospitals=hospitals,
+        metrics=metrics,
+        hospital_names=tuple(hospital_names),
+        labels=build_labels(pivot),
+        averages=averages,
+        info_records=tuple(build_info_records(pivot, hospitals)),
+        metric_records=tuple(build_metric_records(pivot, averages)),
+        id_index=build_id_index(pivot),
+        name_index=build_name_index(pivot),
+        page_index=build_page_index(pivot),
+        distributions=build_distributions(pivot, metrics),
+        peers=build_peer_cube(pivot, hospitals, metrics),
+        similarity=build_similarity_index(pivot, metrics),
+        search=build_search_index(pivot, hospitals),
+        ranking=ranking,
+        composite=build_composite_model(pivot, ranking.metrics, ranking.values),
+    )
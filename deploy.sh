@@ -70,6 +70,7 @@ build_frontend() {
 # Deploy frontend to Vercel
 deploy_frontend_vercel() {
     print_status "Deploying frontend to Vercel..."
+    # The Vercel build (npm run build:api) precomputes the API data artifact
     
     if ! command -v vercel &> /dev/null; then
         print_warning "Vercel CLI not found. Installing..."